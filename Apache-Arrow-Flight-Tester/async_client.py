@@ -0,0 +1,195 @@
+import time
+import asyncio
+import functools
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow
+from pyarrow import flight, Schema
+from pyarrow._flight import ActionType, FlightInfo, Result, Ticket
+
+from pool import FlightClientPool
+from server import ModelarDBServerFlightClient
+from sinks import ResultSink
+from wrapper import PutStatistics, abort_put
+from protobuf import protocol_pb2
+
+
+class AsyncModelarDBServerFlightClient:
+    """
+    Asyncio front-end for ModelarDBServerFlightClient. The blocking Apache Arrow Flight calls are executed by a thread
+    pool with max_threads threads and at most max_concurrency calls and streams are in progress at once. Streams only
+    use a thread while a record batch is read or written, so many concurrent streams can share a few threads.
+    """
+
+    def __init__(self, location: str, token: str | None = None, pool: FlightClientPool | None = None,
+                 max_concurrency: int = 256, max_threads: int = 32):
+        self.client = ModelarDBServerFlightClient(location, token=token, pool=pool)
+        self._executor = ThreadPoolExecutor(max_threads)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> "AsyncModelarDBServerFlightClient":
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the thread pool and close the client."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+    async def _call(self, function: Callable, *args, **kwargs):
+        """Execute function with args and kwargs in the thread pool while respecting the concurrency limit."""
+        async with self._semaphore:
+            return await self._run_in_thread(function, *args, **kwargs)
+
+    async def _run_in_thread(self, function: Callable, *args, **kwargs):
+        """Execute function with args and kwargs in the thread pool without acquiring the concurrency limit."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    # Apache Arrow Flight methods.
+    async def list_flights(self) -> list[FlightInfo]:
+        """Asynchronous version of FlightClientWrapper.list_flights."""
+        return await self._call(self.client.list_flights)
+
+    async def get_schema(self, table_name: str) -> Schema:
+        """Asynchronous version of FlightClientWrapper.get_schema."""
+        return await self._call(self.client.get_schema, table_name)
+
+    async def do_get(self, ticket: Ticket, sink: ResultSink | None = None) -> None:
+        """Asynchronous version of FlightClientWrapper.do_get. The sink is written to from the thread pool."""
+        return await self._call(self.client.do_get, ticket, sink)
+
+    async def do_get_batches(self, ticket: Ticket) -> AsyncIterator[pyarrow.RecordBatch]:
+        """Asynchronous version of FlightClientWrapper.do_get_batches that yields the record batches as received."""
+        async with self._semaphore:
+            # The client is resolved in the thread pool as acquiring it from a pool can block on a health check.
+            response = await self._run_in_thread(lambda: self.client.flight_client.do_get(ticket))
+
+            # The stream is cancelled if the consumer stops iterating before it has been read.
+            finished = False
+            try:
+                while (record_batch := await self._run_in_thread(_read_record_batch, response)) is not None:
+                    yield record_batch
+                finished = True
+            finally:
+                if not finished:
+                    response.cancel()
+
+    async def do_put(self, table_name: str, record_batch: pyarrow.RecordBatch) -> PutStatistics:
+        """Asynchronous version of FlightClientWrapper.do_put."""
+        return await self._call(self.client.do_put, table_name, record_batch)
+
+    async def do_put_batches(self, table_name: str, schema: Schema,
+                             record_batches: Iterable[pyarrow.RecordBatch] | AsyncIterable[pyarrow.RecordBatch],
+                             **chunk_options) -> PutStatistics:
+        """
+        Asynchronous version of FlightClientWrapper.do_put_batches. If record_batches is an asynchronous iterable,
+        each record batch is written as it is produced and chunk_options are not used.
+        """
+        if not isinstance(record_batches, AsyncIterable):
+            return await self._call(self.client.do_put_batches, table_name, schema, record_batches, **chunk_options)
+
+        async with self._semaphore:
+            statistics = PutStatistics()
+            start_time = time.perf_counter()
+
+            upload_descriptor = flight.FlightDescriptor.for_path(table_name)
+            writer, _ = await self._run_in_thread(lambda: self.client.flight_client.do_put(upload_descriptor, schema))
+
+            # The stream is only closed normally if all of the record batches were written, otherwise it is aborted.
+            try:
+                async for record_batch in record_batches:
+                    await self._run_in_thread(writer.write_batch, record_batch)
+                    statistics.rows += record_batch.num_rows
+                    statistics.bytes += record_batch.nbytes
+            except BaseException:
+                await self._run_in_thread(abort_put, writer)
+                raise
+
+            await self._run_in_thread(writer.close)
+
+            statistics.seconds = time.perf_counter() - start_time
+            return statistics
+
+    async def do_action(self, action_type: str, action_body: bytes) -> list[Result]:
+        """Asynchronous version of FlightClientWrapper.do_action."""
+        return await self._call(self.client.do_action, action_type, action_body)
+
+    async def list_actions(self) -> list[ActionType]:
+        """Asynchronous version of FlightClientWrapper.list_actions."""
+        return await self._call(self.client.list_actions)
+
+    # ModelarDB methods.
+    async def list_table_names(self) -> list[str]:
+        """Asynchronous version of ModelarDBServerFlightClient.list_table_names."""
+        return await self._call(self.client.list_table_names)
+
+    async def workload_balanced_query(self, query: str, sink: ResultSink | None = None, **kwargs) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.workload_balanced_query."""
+        return await self._call(self.client.workload_balanced_query, query, sink, **kwargs)
+
+    async def create_table(self, table_name: str, columns: list[tuple[str, str]], time_series_table=False) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.create_table."""
+        return await self._call(self.client.create_table, table_name, columns, time_series_table)
+
+    async def drop_tables(self, table_names: list[str]) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.drop_tables."""
+        return await self._call(self.client.drop_tables, table_names)
+
+    async def truncate_tables(self, table_names: list[str]) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.truncate_tables."""
+        return await self._call(self.client.truncate_tables, table_names)
+
+    async def vacuum_tables(self, table_names: list[str]) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.vacuum_tables."""
+        return await self._call(self.client.vacuum_tables, table_names)
+
+    async def optimize_tables(self, table_names: list[str]) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.optimize_tables."""
+        return await self._call(self.client.optimize_tables, table_names)
+
+    async def create_normal_table_from_metadata(self, table_name: str, schema: pyarrow.Schema) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.create_normal_table_from_metadata."""
+        return await self._call(self.client.create_normal_table_from_metadata, table_name, schema)
+
+    async def create_time_series_table_from_metadata(self, table_name: str, schema: pyarrow.Schema, error_bounds: list[
+        protocol_pb2.TableMetadata.TimeSeriesTableMetadata.ErrorBound], generated_columns: list[bytes]) -> None:
+        """Asynchronous version of ModelarDBServerFlightClient.create_time_series_table_from_metadata."""
+        return await self._call(self.client.create_time_series_table_from_metadata, table_name, schema, error_bounds,
+                                generated_columns)
+
+    async def get_configuration(self) -> protocol_pb2.Configuration:
+        """Asynchronous version of ModelarDBServerFlightClient.get_configuration."""
+        return await self._call(self.client.get_configuration)
+
+    async def update_configuration(self, setting: protocol_pb2.UpdateConfiguration.Setting,
+                                   new_value: int) -> list[Result]:
+        """Asynchronous version of ModelarDBServerFlightClient.update_configuration."""
+        return await self._call(self.client.update_configuration, setting, new_value)
+
+    async def node_type(self) -> str:
+        """Asynchronous version of ModelarDBServerFlightClient.node_type."""
+        return await self._call(self.client.node_type)
+
+    async def list_nodes(self) -> list[protocol_pb2.NodeMetadata]:
+        """Asynchronous version of ModelarDBServerFlightClient.list_nodes."""
+        return await self._call(self.client.list_nodes)
+
+    async def node_metrics(self) -> protocol_pb2.NodeMetrics:
+        """Asynchronous version of ModelarDBServerFlightClient.node_metrics."""
+        return await self._call(self.client.node_metrics)
+
+    async def flush_memory(self) -> list[Result]:
+        """Flush the data in memory of the node to disk."""
+        return await self._call(self.client.do_action, "FlushMemory", b"")
+
+
+def _read_record_batch(response: flight.FlightStreamReader) -> pyarrow.RecordBatch | None:
+    """Read the next record batch from response or return None if there are no more record batches."""
+    try:
+        return response.read_chunk().data
+    except StopIteration:
+        return None
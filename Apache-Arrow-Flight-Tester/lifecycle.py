@@ -0,0 +1,124 @@
+import time
+import signal
+import threading
+import subprocess
+from collections import deque
+from typing import IO
+
+from pyarrow import flight
+
+
+class ModelarDBServerProcess:
+    """
+    Lifecycle manager for a modelardbd process. The server is ready when it responds to the NodeType action, which is
+    probed with exponential backoff, so readiness does not depend on the format of the log. stdout and stderr are
+    drained by background threads into ring buffers with the last max_lines lines so the process never blocks on a full
+    pipe, and shutdown is waited for without polling.
+    """
+
+    def __init__(self, command: list[str], location: str = "grpc://127.0.0.1:9999", cwd: str | None = None,
+                 env: dict[str, str] | None = None, max_lines: int = 1000):
+        self.command = command
+        self.location = location
+        self.cwd = cwd
+        self.env = env
+        self.stdout_lines: deque[str] = deque(maxlen=max_lines)
+        self.stderr_lines: deque[str] = deque(maxlen=max_lines)
+        self.error_occurred = threading.Event()
+        self._process: subprocess.Popen | None = None
+        self._drain_threads: list[threading.Thread] = []
+
+    def __enter__(self) -> "ModelarDBServerProcess":
+        self.start()
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        if self.is_running():
+            self.stop()
+
+    def start(self, timeout: float = 60.0, initial_backoff: float = 0.01, max_backoff: float = 1.0) -> None:
+        """Start the process and wait until it responds to NodeType or raise TimeoutError after timeout seconds."""
+        self._process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+
+        self._drain_threads = [
+            threading.Thread(target=self._drain, args=(self._process.stdout, self.stdout_lines, False), daemon=True),
+            threading.Thread(target=self._drain, args=(self._process.stderr, self.stderr_lines, True), daemon=True),
+        ]
+        for drain_thread in self._drain_threads:
+            drain_thread.start()
+
+        deadline = time.monotonic() + timeout
+        backoff = initial_backoff
+        while not self._responds_to_node_type(min(max_backoff, timeout)):
+            if self._process.poll() is not None:
+                self._join_drain_threads()
+                raise RuntimeError(f"modelardbd exited with code {self._process.returncode} before it was ready:\n"
+                                   f"{self.stderr()}")
+
+            if time.monotonic() + backoff > deadline:
+                self.kill()
+                raise TimeoutError(f"modelardbd was not ready within {timeout} seconds.")
+
+            time.sleep(backoff)
+            backoff = min(2 * backoff, max_backoff)
+
+    def stop(self, timeout: float = 60.0) -> int:
+        """Send SIGINT so the process flushes and exits, and return its exit code or raise TimeoutError."""
+        self._process.send_signal(signal.SIGINT)
+
+        try:
+            self._process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            raise TimeoutError(f"modelardbd did not shut down within {timeout} seconds.")
+
+        self._join_drain_threads()
+        return self._process.returncode
+
+    def kill(self) -> None:
+        """Kill the process without letting it flush and wait for it to exit."""
+        self._process.kill()
+        self._process.wait()
+        self._join_drain_threads()
+
+    def is_running(self) -> bool:
+        """Return True if the process has been started and has not exited."""
+        return self._process is not None and self._process.poll() is None
+
+    def stdout(self) -> str:
+        """Return the last lines written to stdout."""
+        return "".join(self.stdout_lines)
+
+    def stderr(self) -> str:
+        """Return the last lines written to stderr."""
+        return "".join(self.stderr_lines)
+
+    def _responds_to_node_type(self, timeout: float) -> bool:
+        """Return True if the process responds to the NodeType action within timeout seconds."""
+        flight_client = flight.FlightClient(self.location)
+        try:
+            options = flight.FlightCallOptions(timeout=timeout)
+            list(flight_client.do_action(flight.Action("NodeType", b""), options))
+            return True
+        except flight.FlightError:
+            return False
+        finally:
+            flight_client.close()
+
+    def _drain(self, stream: IO[bytes], lines: deque[str], detect_errors: bool) -> None:
+        """Read stream line by line into lines until it is closed and flag errors if detect_errors is True."""
+        for line in iter(stream.readline, b""):
+            decoded_line = line.decode("utf-8", errors="replace")
+            lines.append(decoded_line)
+
+            normalized = decoded_line.lower()
+            if detect_errors and ("error" in normalized or "panicked" in normalized):
+                self.error_occurred.set()
+
+        stream.close()
+
+    def _join_drain_threads(self) -> None:
+        """Wait until all of the output written by the process has been drained."""
+        for drain_thread in self._drain_threads:
+            drain_thread.join()
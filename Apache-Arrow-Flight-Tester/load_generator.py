@@ -0,0 +1,212 @@
+import os
+import time
+import argparse
+import threading
+from dataclasses import dataclass, field
+
+import numpy
+from pyarrow._flight import Ticket
+
+import util
+from server import ModelarDBServerFlightClient
+from protobuf import protocol_pb2
+
+
+@dataclass
+class OperationStatistics:
+    """Latency of each operation of one type, the number of rows and errors for all of them, and the first error."""
+
+    latencies_in_seconds: list[float] = field(default_factory=list)
+    rows: int = 0
+    errors: int = 0
+    first_error: Exception | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, latency_in_seconds: float, rows: int) -> None:
+        """Record a successful operation that took latency_in_seconds and transferred rows rows."""
+        with self.lock:
+            self.latencies_in_seconds.append(latency_in_seconds)
+            self.rows += rows
+
+    def add_error(self, error: Exception) -> None:
+        """Record a failed operation that raised error."""
+        with self.lock:
+            self.errors += 1
+            if self.first_error is None:
+                self.first_error = error
+
+    def print_summary(self, operation_type: str, duration_in_seconds: float) -> None:
+        """Print the throughput and latency percentiles of the operations over duration_in_seconds seconds."""
+        operations = len(self.latencies_in_seconds)
+        print(f"{operation_type}:")
+        print(f"- Operations: {operations} ({self.errors} failed)")
+        if self.first_error is not None:
+            print(f"- First Error: {type(self.first_error).__name__}: {self.first_error}")
+
+        if operations == 0:
+            return
+
+        p50, p95, p99 = numpy.percentile(self.latencies_in_seconds, [50, 95, 99]) * 1000
+        print(f"- Throughput: {operations / duration_in_seconds:.2f} operations/s, "
+              f"{self.rows / duration_in_seconds:.0f} rows/s")
+        print(f"- Latency: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms")
+
+
+class _RowBudget:
+    """Thread-safe budget of rows that the ingest clients claim from before each do_put."""
+
+    def __init__(self, rows: int | None):
+        self._remaining_rows = rows
+        self._lock = threading.Lock()
+
+    def claim(self, rows: int) -> int:
+        """Claim up to rows rows from the budget and return how many were claimed."""
+        if self._remaining_rows is None:
+            return rows
+
+        with self._lock:
+            claimed_rows = min(rows, self._remaining_rows)
+            self._remaining_rows -= claimed_rows
+            return claimed_rows
+
+
+def create_load_test_table(server_client: ModelarDBServerFlightClient, table_name: str, num_fields: int) -> None:
+    """Create a lossless time series table matching the generated data if it does not already exist."""
+    if table_name in server_client.list_table_names():
+        return
+
+    schema = util.get_time_series_table_schema(num_fields)
+    lossless = protocol_pb2.TableMetadata.TimeSeriesTableMetadata.ErrorBound.Type.LOSSLESS
+    error_bounds = [protocol_pb2.TableMetadata.TimeSeriesTableMetadata.ErrorBound(value=0, type=lossless)
+                    for _ in range(len(schema))]
+    generated_column_expressions = [b'' for _ in range(len(schema))]
+
+    server_client.create_time_series_table_from_metadata(table_name, schema, error_bounds,
+                                                         generated_column_expressions)
+
+
+def run_load_test(urls: list[str], table_name: str, ingest_clients: int, query_clients: int, queries: list[str],
+                  duration_in_seconds: float | None = None, row_budget: int | None = None, batch_size: int = 10000,
+                  num_fields: int = 3, tag_cardinality: int = 2, distribution: util.Distribution = "noise",
+                  token: str | None = None) -> dict[str, OperationStatistics]:
+    """
+    Run ingest_clients clients that ingest generated record batches with batch_size rows into table_name and
+    query_clients clients that execute queries round-robin against the nodes at urls. Each client has its own
+    connection and the clients are spread evenly across urls. The load test stops after duration_in_seconds seconds or
+    when row_budget rows have been ingested, whichever comes first. Return the statistics for each type of operation.
+    """
+    if duration_in_seconds is None and (row_budget is None or ingest_clients == 0):
+        raise ValueError("A duration or a row budget and at least one ingest client is required.")
+
+    server_client = ModelarDBServerFlightClient(urls[0], token=token)
+    try:
+        create_load_test_table(server_client, table_name, num_fields)
+    finally:
+        server_client.close()
+
+    statistics = {"Ingest": OperationStatistics(), "Query": OperationStatistics()}
+    remaining_rows = _RowBudget(row_budget)
+    stop = threading.Event()
+    ingest_done = threading.Event()
+    deadline = time.perf_counter() + duration_in_seconds if duration_in_seconds is not None else None
+
+    def should_stop() -> bool:
+        return stop.is_set() or (deadline is not None and time.perf_counter() >= deadline)
+
+    def ingest(client_index: int) -> None:
+        server_client = ModelarDBServerFlightClient(urls[client_index % len(urls)], token=token)
+
+        # The generator never runs out of rows, the row budget and the duration decides when to stop. Each client
+        # has its own tag values, so the clients ingest different time series instead of duplicating timestamps.
+        record_batches = util.create_record_batches(2 ** 62, batch_size, tag_cardinality, num_fields,
+                                                    distribution=distribution, seed=client_index,
+                                                    tag_offset=client_index * tag_cardinality)
+
+        try:
+            while not should_stop():
+                claimed_rows = remaining_rows.claim(batch_size)
+                if claimed_rows == 0:
+                    return
+
+                record_batch = next(record_batches).slice(0, claimed_rows)
+                start_time = time.perf_counter()
+                try:
+                    server_client.do_put(table_name, record_batch)
+                    statistics["Ingest"].add(time.perf_counter() - start_time, claimed_rows)
+                except Exception as error:
+                    statistics["Ingest"].add_error(error)
+        finally:
+            server_client.close()
+
+    def query(client_index: int) -> None:
+        server_client = ModelarDBServerFlightClient(urls[client_index % len(urls)], token=token)
+
+        query_index = client_index
+        try:
+            while not should_stop() and not ingest_done.is_set():
+                start_time = time.perf_counter()
+                try:
+                    rows = 0
+                    for record_batch in server_client.do_get_batches(Ticket(queries[query_index % len(queries)])):
+                        rows += record_batch.num_rows
+                    statistics["Query"].add(time.perf_counter() - start_time, rows)
+                except Exception as error:
+                    statistics["Query"].add_error(error)
+                query_index += 1
+        finally:
+            server_client.close()
+
+    ingest_threads = [threading.Thread(target=ingest, args=(index,)) for index in range(ingest_clients)]
+    query_threads = [threading.Thread(target=query, args=(index,)) for index in range(query_clients)]
+
+    start_time = time.perf_counter()
+    for thread in ingest_threads + query_threads:
+        thread.start()
+
+    try:
+        for thread in ingest_threads:
+            thread.join()
+
+        # The load test is over when the ingest clients are done, unless only queries are executed.
+        if ingest_clients > 0:
+            ingest_done.set()
+
+        for thread in query_threads:
+            thread.join()
+    finally:
+        stop.set()
+
+    duration_in_seconds = time.perf_counter() - start_time
+    for operation_type, operation_statistics in statistics.items():
+        operation_statistics.print_summary(operation_type, duration_in_seconds)
+
+    return statistics
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse the command line arguments for the load generator."""
+    parser = argparse.ArgumentParser(description="Generate concurrent ingest and query load against ModelarDB nodes.")
+    parser.add_argument("urls", nargs="+", help="locations of the nodes, e.g., grpc://127.0.0.1:9999")
+    parser.add_argument("--table", default="load_test_time_series_table", help="time series table to ingest into")
+    parser.add_argument("--ingest-clients", type=int, default=1, help="number of concurrent ingest clients")
+    parser.add_argument("--query-clients", type=int, default=1, help="number of concurrent query clients")
+    parser.add_argument("--duration", type=float, help="number of seconds to generate load for")
+    parser.add_argument("--row-budget", type=int, help="number of rows to ingest before stopping")
+    parser.add_argument("--batch-size", type=int, default=10000, help="number of rows in each do_put")
+    parser.add_argument("--num-fields", type=int, default=3, help="number of field columns in the table")
+    parser.add_argument("--tag-cardinality", type=int, default=2, help="number of distinct values per tag")
+    parser.add_argument("--distribution", default="noise", choices=["noise", "random_walk", "sine", "step"],
+                        help="distribution of the generated field values")
+    parser.add_argument("--query", action="append", dest="queries",
+                        help="query to execute, can be given multiple times (default: SELECT COUNT(*) FROM table)")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    queries = arguments.queries if arguments.queries else [f"SELECT COUNT(*) FROM {arguments.table}"]
+
+    run_load_test(arguments.urls, arguments.table, arguments.ingest_clients, arguments.query_clients, queries,
+                  arguments.duration, arguments.row_budget, arguments.batch_size, arguments.num_fields,
+                  arguments.tag_cardinality, arguments.distribution, os.environ.get("MODELARDB_TOKEN"))
@@ -0,0 +1,156 @@
+import json
+import time
+import base64
+import threading
+from dataclasses import dataclass, field
+
+from pyarrow import flight
+
+
+class _BearerTokenMiddlewareFactory(flight.ClientMiddlewareFactory):
+    """Creates middleware that attaches a Bearer token to every outgoing call."""
+
+    def __init__(self, token: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._token = token
+
+    def start_call(self, _info) -> flight.ClientMiddleware:
+        return _BearerTokenMiddleware(self._token)
+
+
+class _BearerTokenMiddleware(flight.ClientMiddleware):
+    """Adds 'authorization: Bearer <token>' to the outgoing request headers."""
+
+    def __init__(self, token: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._token = token
+
+    def sending_headers(self) -> dict[str, str]:
+        return {"authorization": f"Bearer {self._token}"}
+
+
+def create_flight_client(location: str, token: str | None = None) -> flight.FlightClient:
+    """Create a FlightClient for location that attaches token as a Bearer token to every call if one is given."""
+    middleware = [_BearerTokenMiddlewareFactory(token)] if token else []
+    return flight.FlightClient(location, middleware=middleware)
+
+
+@dataclass
+class _PooledClient:
+    """A FlightClient in the pool, the information used to decide when it should be evicted, and its lock."""
+
+    flight_client: flight.FlightClient
+    last_used: float
+    expires_at: float | None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class FlightClientPool:
+    """
+    Pool of FlightClients keyed by location and bearer token, so the gRPC channel, TLS handshake, and middleware
+    setup are reused across calls. FlightClients are thread-safe, so a pooled client can be shared by multiple callers.
+    Clients that have been idle for more than max_idle_seconds are evicted, clients that have been idle for more than
+    health_check_after_seconds are checked with the NodeType action before they are reused, and clients are never
+    reused after their bearer token expires if it is a JWT with an exp claim. Only one client is created per location
+    and token, as concurrent callers wait for the health check of the client instead of creating their own. Clients
+    that are evicted or fail the health check are closed, so callers should acquire a client again for each call
+    instead of holding on to it. Streams that are in progress are not interrupted when their client is closed.
+    """
+
+    def __init__(self, max_idle_seconds: float = 300.0, health_check_after_seconds: float = 30.0,
+                 health_check_timeout_seconds: float = 5.0):
+        self._max_idle_seconds = max_idle_seconds
+        self._health_check_after_seconds = health_check_after_seconds
+        self._health_check_timeout_seconds = health_check_timeout_seconds
+        self._clients: dict[tuple[str, str | None], _PooledClient] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, location: str, token: str | None = None) -> flight.FlightClient:
+        """Return a FlightClient for location that uses token, either from the pool or a newly created one."""
+        key = (str(location), token)
+        self.evict_idle()
+
+        while True:
+            with self._lock:
+                pooled_client = self._clients.get(key)
+                if pooled_client is None:
+                    flight_client = create_flight_client(location, token)
+                    self._clients[key] = _PooledClient(flight_client, time.monotonic(), _token_expiry(token))
+                    return flight_client
+
+            # The client stays in the pool while it is checked, and the check is serialized per key.
+            with pooled_client.lock:
+                with self._lock:
+                    if self._clients.get(key) is not pooled_client:
+                        continue
+
+                if self._is_reusable(pooled_client, time.monotonic()):
+                    with self._lock:
+                        pooled_client.last_used = time.monotonic()
+                    return pooled_client.flight_client
+
+                with self._lock:
+                    if self._clients.get(key) is pooled_client:
+                        del self._clients[key]
+                pooled_client.flight_client.close()
+
+    def evict_idle(self) -> None:
+        """Remove and close the clients that have been idle for too long or whose token has expired."""
+        now = time.monotonic()
+        evicted_clients = []
+        with self._lock:
+            for key, pooled_client in list(self._clients.items()):
+                is_idle = now - pooled_client.last_used > self._max_idle_seconds
+                if not is_idle and not _has_expired(pooled_client, time.time()):
+                    continue
+
+                # Clients that are being checked by acquire are not evicted.
+                if pooled_client.lock.acquire(blocking=False):
+                    del self._clients[key]
+                    pooled_client.lock.release()
+                    evicted_clients.append(pooled_client)
+
+        for pooled_client in evicted_clients:
+            pooled_client.flight_client.close()
+
+    def close(self) -> None:
+        """Close and remove all of the clients in the pool."""
+        with self._lock:
+            pooled_clients = list(self._clients.values())
+            self._clients.clear()
+
+        for pooled_client in pooled_clients:
+            pooled_client.flight_client.close()
+
+    def _is_reusable(self, pooled_client: _PooledClient, now: float) -> bool:
+        """Return True if the token of pooled_client has not expired and the node still responds if it was idle."""
+        if _has_expired(pooled_client, time.time()):
+            return False
+
+        if now - pooled_client.last_used <= self._health_check_after_seconds:
+            return True
+
+        try:
+            options = flight.FlightCallOptions(timeout=self._health_check_timeout_seconds)
+            list(pooled_client.flight_client.do_action(flight.Action("NodeType", b""), options))
+            return True
+        except flight.FlightError:
+            return False
+
+
+def _has_expired(pooled_client: _PooledClient, now: float) -> bool:
+    """Return True if the bearer token used by pooled_client has expired."""
+    return pooled_client.expires_at is not None and now >= pooled_client.expires_at
+
+
+def _token_expiry(token: str | None) -> float | None:
+    """Return the time in seconds since the epoch when token expires if it is a JWT with an exp claim, else None."""
+    if not token or token.count(".") != 2:
+        return None
+
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (ValueError, KeyError, TypeError):
+        return None
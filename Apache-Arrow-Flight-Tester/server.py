@@ -1,11 +1,16 @@
 import os
+import queue
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 import pyarrow
 from pyarrow import flight
-from pyarrow._flight import Result, Ticket
+from pyarrow._flight import FlightEndpoint, Result, Ticket
 
 import util
-from wrapper import FlightClientWrapper
+from sinks import ResultSink
+from wrapper import FlightClientWrapper, put_unless_stopped, write_to_sink
 from protobuf import protocol_pb2
 
 
@@ -17,21 +22,127 @@ class ModelarDBServerFlightClient(FlightClientWrapper):
         flights = self.list_flights()
         return [table_name.decode("utf-8") for table_name in flights[0].descriptor.path]
 
-    def workload_balanced_query(self, query: str) -> None:
+    def workload_balanced_query(self, query: str, sink: ResultSink | None = None, fan_out: bool = False,
+                                preserve_order: bool = True, max_workers: int | None = None) -> None:
         """
-        Retrieve a cloud node that can execute the given query and execute the query on the node. It is assumed that
-        the cluster has at least one cloud node.
+        Retrieve the cloud nodes that can execute the given query and execute the query on them. The result is
+        written to sink if one is given. By default, only the first endpoint is read. If fan_out is True, all of the
+        endpoints are read concurrently by at most max_workers threads and their record batches are merged, either in
+        endpoint order if preserve_order is True or as they are received. If a node is unreachable, the alternate
+        locations of its endpoint are tried. If the query has no endpoints, the result is empty.
         """
-        print("Retrieving cloud node that can execute the query...")
+        if max_workers is not None and max_workers <= 0:
+            raise ValueError(f"max_workers must be positive but got {max_workers}.")
+
+        print("Retrieving cloud nodes that can execute the query...")
         query_descriptor = flight.FlightDescriptor.for_command(query)
         flight_info = self.flight_client.get_flight_info(query_descriptor)
 
-        endpoint = flight_info.endpoints[0]
-        cloud_node_url = endpoint.locations[0]
+        if not flight_info.endpoints:
+            write_to_sink(sink, flight_info.schema, [])
+            return
+
+        if not fan_out:
+            schema, record_batches = self._read_endpoint(flight_info.endpoints[0])
+            write_to_sink(sink, schema, record_batches)
+            return
 
-        print(f"Executing query on {cloud_node_url}...")
-        cloud_client = ModelarDBServerFlightClient(cloud_node_url, token=self._token)
-        cloud_client.do_get(endpoint.ticket)
+        self._read_endpoints_concurrently(flight_info.endpoints, sink, preserve_order, max_workers)
+
+    def _read_endpoint(self, endpoint: FlightEndpoint) -> tuple[pyarrow.Schema, Iterator[pyarrow.RecordBatch]]:
+        """
+        Start reading endpoint from the first of its locations that is reachable and return the schema and an
+        iterator over the record batches. If the endpoint has no locations, it is read from this node.
+        """
+        if not endpoint.locations:
+            response = self.flight_client.do_get(endpoint.ticket)
+            return response.schema, (chunk.data for chunk in response)
+
+        errors = []
+        for location in endpoint.locations:
+            print(f"Executing query on {location}...")
+            cloud_client = ModelarDBServerFlightClient(location, token=self._token, pool=self._pool)
+
+            try:
+                response = cloud_client.flight_client.do_get(endpoint.ticket)
+                schema = response.schema
+            except (flight.FlightUnavailableError, flight.FlightTimedOutError) as error:
+                print(f"Failed to execute query on {location}, trying the next location...")
+                errors.append(error)
+                continue
+
+            def record_batches(cloud_client=cloud_client, response=response) -> Iterator[pyarrow.RecordBatch]:
+                # cloud_client is referenced so the connection is open until the endpoint has been read.
+                for chunk in response:
+                    yield chunk.data
+
+            return schema, record_batches()
+
+        raise flight.FlightUnavailableError(f"No location of the endpoint could be reached: {errors}")
+
+    def _read_endpoints_concurrently(self, endpoints: list[FlightEndpoint], sink: ResultSink | None,
+                                     preserve_order: bool, max_workers: int | None) -> None:
+        """
+        Read endpoints using a thread pool and write the merged record batches to sink, if one is given, from the
+        calling thread. If preserve_order is True, the record batches of later endpoints are buffered until all the
+        record batches of the earlier endpoints have been written.
+        """
+        end_of_endpoint = object()
+        max_workers = max_workers if max_workers else len(endpoints)
+        merged_queue = queue.Queue(maxsize=2 * max_workers)
+        stop_reading = threading.Event()
+
+        def read(endpoint_index: int) -> None:
+            try:
+                schema, record_batches = self._read_endpoint(endpoints[endpoint_index])
+                put_unless_stopped(merged_queue, (endpoint_index, schema), stop_reading)
+                for record_batch in record_batches:
+                    if not put_unless_stopped(merged_queue, (endpoint_index, record_batch), stop_reading):
+                        return
+                put_unless_stopped(merged_queue, (endpoint_index, end_of_endpoint), stop_reading)
+            except Exception as error:
+                put_unless_stopped(merged_queue, (endpoint_index, error), stop_reading)
+
+        buffered_record_batches = [[] for _ in endpoints]
+        finished_endpoints = [False for _ in endpoints]
+        next_endpoint_index = 0
+        sink_is_open = False
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            try:
+                for endpoint_index in range(len(endpoints)):
+                    executor.submit(read, endpoint_index)
+
+                while not all(finished_endpoints):
+                    endpoint_index, item = merged_queue.get()
+
+                    if isinstance(item, Exception):
+                        raise item
+                    elif isinstance(item, pyarrow.Schema):
+                        if sink and not sink_is_open:
+                            sink.open(item)
+                            sink_is_open = True
+                    elif item is end_of_endpoint:
+                        finished_endpoints[endpoint_index] = True
+                    elif not preserve_order or endpoint_index == next_endpoint_index:
+                        if sink:
+                            sink.write_batch(item)
+                    else:
+                        buffered_record_batches[endpoint_index].append(item)
+
+                    # Write the buffered record batches of the endpoints whose turn it is.
+                    while (preserve_order and next_endpoint_index < len(endpoints)
+                           and finished_endpoints[next_endpoint_index]):
+                        next_endpoint_index += 1
+                        if next_endpoint_index < len(endpoints):
+                            for record_batch in buffered_record_batches[next_endpoint_index]:
+                                if sink:
+                                    sink.write_batch(record_batch)
+                            buffered_record_batches[next_endpoint_index] = []
+            finally:
+                stop_reading.set()
+                if sink_is_open:
+                    sink.close()
 
     def create_table(self, table_name: str, columns: list[tuple[str, str]], time_series_table=False) -> None:
         """
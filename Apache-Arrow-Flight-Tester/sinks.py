@@ -0,0 +1,113 @@
+import pprint
+from abc import ABC, abstractmethod
+
+import pyarrow
+from pyarrow import ipc, parquet
+
+
+class ResultSink(ABC):
+    """Consumer of the record batches in a query result. The schema is given to open() before any batches are written."""
+
+    def open(self, schema: pyarrow.Schema) -> None:
+        """Prepare the sink for receiving record batches with the given schema."""
+        self.schema = schema
+
+    @abstractmethod
+    def write_batch(self, record_batch: pyarrow.RecordBatch) -> None:
+        """Consume the given record batch."""
+
+    def close(self) -> None:
+        """Finish consuming the result and release any resources held by the sink."""
+
+
+class TableSink(ResultSink):
+    """Collects the record batches in a table without copying them."""
+
+    def open(self, schema: pyarrow.Schema) -> None:
+        """Prepare the sink for receiving record batches with the given schema."""
+        super().open(schema)
+        self._record_batches = []
+        self.table = None
+
+    def write_batch(self, record_batch: pyarrow.RecordBatch) -> None:
+        """Add the given record batch to the table."""
+        self._record_batches.append(record_batch)
+
+    def close(self) -> None:
+        """Create the table from the collected record batches."""
+        self.table = pyarrow.Table.from_batches(self._record_batches, schema=self.schema)
+        self._record_batches = []
+
+
+class IpcFileSink(ResultSink):
+    """Writes the record batches to an Apache Arrow IPC file, which is also known as a Feather V2 file."""
+
+    def __init__(self, path: str, compression: str | None = None):
+        self._path = path
+        self._compression = compression
+
+    def open(self, schema: pyarrow.Schema) -> None:
+        """Create the file and write the schema to it."""
+        super().open(schema)
+        options = ipc.IpcWriteOptions(compression=self._compression)
+        self._writer = ipc.new_file(self._path, schema, options=options)
+
+    def write_batch(self, record_batch: pyarrow.RecordBatch) -> None:
+        """Write the given record batch to the file."""
+        self._writer.write_batch(record_batch)
+
+    def close(self) -> None:
+        """Write the footer of the file and close it."""
+        self._writer.close()
+
+
+class ParquetSink(ResultSink):
+    """Writes the record batches to an Apache Parquet file. Additional arguments are given to ParquetWriter."""
+
+    def __init__(self, path: str, **writer_options):
+        self._path = path
+        self._writer_options = writer_options
+
+    def open(self, schema: pyarrow.Schema) -> None:
+        """Create the file that the record batches are written to."""
+        super().open(schema)
+        self._writer = parquet.ParquetWriter(self._path, schema, **self._writer_options)
+
+    def write_batch(self, record_batch: pyarrow.RecordBatch) -> None:
+        """Write the given record batch to the file."""
+        self._writer.write_batch(record_batch)
+
+    def close(self) -> None:
+        """Write the footer of the file and close it."""
+        self._writer.close()
+
+
+class PrintSink(ResultSink):
+    """Pretty-prints at most max_rows rows of the result. Only the printed rows are converted to Python objects."""
+
+    def __init__(self, max_rows: int | None = None):
+        self._max_rows = max_rows
+
+    def open(self, schema: pyarrow.Schema) -> None:
+        """Prepare the sink for printing record batches with the given schema."""
+        super().open(schema)
+        self._printed_rows = 0
+        self._skipped_rows = 0
+
+    def write_batch(self, record_batch: pyarrow.RecordBatch) -> None:
+        """Print the rows in the given record batch that are within the row limit."""
+        if self._max_rows is None:
+            rows_to_print = record_batch.num_rows
+        else:
+            rows_to_print = max(0, min(record_batch.num_rows, self._max_rows - self._printed_rows))
+
+        if rows_to_print > 0:
+            pprint.pprint(record_batch.slice(0, rows_to_print).to_pydict())
+
+        self._printed_rows += rows_to_print
+        self._skipped_rows += record_batch.num_rows - rows_to_print
+
+    def close(self) -> None:
+        """Print how many rows were not printed due to the row limit."""
+        if self._skipped_rows > 0:
+            print(f"... {self._skipped_rows} more rows")
@@ -1,54 +1,168 @@
+from __future__ import annotations
+
 import time
-from random import randrange
-from typing import Literal
+from collections.abc import Iterator
+from typing import Literal, TYPE_CHECKING
 
+import numpy
 import pyarrow
 from protobuf import protocol_pb2
 from pyarrow._flight import Ticket
 
-from server import ModelarDBServerFlightClient
+from sinks import PrintSink
+
+# server imports util, so ModelarDBServerFlightClient is only imported for type checking to avoid a circular import.
+if TYPE_CHECKING:
+    from server import ModelarDBServerFlightClient
+
+Distribution = Literal["noise", "random_walk", "sine", "step"]
+
+# The tag values used when the tag cardinality is two, additional values are generated for higher cardinalities.
+TAG_VALUES = {
+    "location": ["aalborg", "nibe"],
+    "install_year": ["2021", "2022"],
+    "model": ["w72", "w73"],
+}
 
+# The range of the values in each field column, additional field columns use the range of FIELD_VALUE_RANGE.
+FIELD_VALUE_RANGES = {
+    "power_output": (0, 30),
+    "wind_speed": (50, 100),
+    "temperature": (0, 40),
+}
+FIELD_VALUE_RANGE = (0, 100)
 
-def create_record_batch(num_rows: int) -> pyarrow.RecordBatch:
+# The number of rows in each period of the sine distribution and in each step of the step distribution.
+SINE_PERIOD_IN_ROWS = 1000
+STEP_LENGTH_IN_ROWS = 1000
+
+# The first timestamp when a seed is given, so the same timestamps are generated every time, 2024-01-01T00:00:00Z.
+SEEDED_START_TIMESTAMP_IN_US = 1704067200000000
+
+
+def create_record_batch(num_rows: int, tag_cardinality: int = 2, num_fields: int = 3,
+                        sampling_interval_in_us: int = 1000000,
+                        distribution: Distribution | list[Distribution] = "noise",
+                        seed: int | None = None, start_timestamp_in_us: int | None = None) -> pyarrow.RecordBatch:
     """
     Create a record batch with num_rows rows of randomly generated data for a table with one timestamp column,
-    three tag columns, and three field columns.
+    three tag columns, and num_fields field columns. See create_record_batches for a description of the arguments.
     """
-    schema = get_time_series_table_schema()
+    return next(create_record_batches(num_rows, max(1, num_rows), tag_cardinality, num_fields,
+                                      sampling_interval_in_us, distribution, seed,
+                                      start_timestamp_in_us=start_timestamp_in_us))
 
-    location = ["aalborg" if i % 2 == 0 else "nibe" for i in range(num_rows)]
-    install_year = ["2021" if i % 2 == 0 else "2022" for i in range(num_rows)]
-    model = ["w72" if i % 2 == 0 else "w73" for i in range(num_rows)]
 
-    timestamp = [round(time.time() * 1000000) + (i * 1000000) for i in range(num_rows)]
-    power_output = [float(randrange(0, 30)) for _ in range(num_rows)]
-    wind_speed = [float(randrange(50, 100)) for _ in range(num_rows)]
-    temperature = [float(randrange(0, 40)) for _ in range(num_rows)]
+def create_record_batches(num_rows: int, batch_size: int, tag_cardinality: int = 2, num_fields: int = 3,
+                          sampling_interval_in_us: int = 1000000,
+                          distribution: Distribution | list[Distribution] = "noise",
+                          seed: int | None = None, tag_offset: int = 0,
+                          start_timestamp_in_us: int | None = None) -> Iterator[pyarrow.RecordBatch]:
+    """
+    Create num_rows rows of randomly generated data for a table with one timestamp column, three tag columns, and
+    num_fields field columns and yield it as record batches with at most batch_size rows, so data sets larger than
+    memory can be generated. Each tag column has tag_cardinality distinct values, the timestamps start from
+    start_timestamp_in_us and are sampling_interval_in_us microseconds apart, and the values of each field column follow
+    distribution, which can also be given per field column. If start_timestamp_in_us is not given, the timestamps start
+    from SEEDED_START_TIMESTAMP_IN_US if seed is given and from the current time otherwise, so the same data is
+    generated every time if seed is given. The tag values start from the value with index tag_offset, so generators
+    with non-overlapping ranges of tag values produce different time series. If num_rows is zero, a single empty record
+    batch is yielded.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive but got {batch_size}.")
 
-    return pyarrow.RecordBatch.from_arrays(
-        [
-            location,
-            install_year,
-            model,
-            timestamp,
-            power_output,
-            wind_speed,
-            temperature,
-        ],
-        schema=schema,
-    )
+    schema = get_time_series_table_schema(num_fields)
+    field_names = schema.names[4:]
+    distributions = distribution if isinstance(distribution, list) else [distribution] * num_fields
+    if len(distributions) != num_fields:
+        raise ValueError(f"Expected {num_fields} distributions but got {len(distributions)}.")
+
+    rng = numpy.random.default_rng(seed)
+    tag_values = {tag_name: pyarrow.array(_tag_values(tag_name, tag_cardinality, tag_offset))
+                  for tag_name in TAG_VALUES}
+    field_states = [{} for _ in field_names]
+    if start_timestamp_in_us is not None:
+        first_timestamp = start_timestamp_in_us
+    elif seed is not None:
+        first_timestamp = SEEDED_START_TIMESTAMP_IN_US
+    else:
+        first_timestamp = round(time.time() * 1000000)
+
+    for offset in range(0, num_rows, batch_size) if num_rows > 0 else [0]:
+        row_numbers = numpy.arange(offset, min(offset + batch_size, num_rows), dtype=numpy.int64)
+        tag_indices = pyarrow.array(row_numbers % tag_cardinality)
 
+        tag_columns = [tag_values[tag_name].take(tag_indices).cast(pyarrow.string_view()) for tag_name in TAG_VALUES]
+        timestamp_column = pyarrow.array(first_timestamp + row_numbers * sampling_interval_in_us,
+                                         pyarrow.timestamp("us"))
+        field_columns = [
+            _generate_values(rng, field_distribution, FIELD_VALUE_RANGES.get(field_name, FIELD_VALUE_RANGE),
+                             row_numbers, field_state)
+            for field_name, field_distribution, field_state in zip(field_names, distributions, field_states)
+        ]
+
+        yield pyarrow.RecordBatch.from_arrays([*tag_columns, timestamp_column, *field_columns], schema=schema)
+
+
+def _tag_values(tag_name: str, tag_cardinality: int, tag_offset: int = 0) -> list[str]:
+    """Return tag_cardinality distinct values starting from index tag_offset for the tag column named tag_name."""
+    end_index = tag_offset + tag_cardinality
+    tag_values = TAG_VALUES[tag_name][tag_offset:end_index]
+    tag_values.extend(f"{tag_name}_{index}" for index in range(tag_offset + len(tag_values), end_index))
+    return tag_values
+
+
+def _generate_values(rng: numpy.random.Generator, distribution: Distribution, value_range: tuple[int, int],
+                     row_numbers: numpy.ndarray, state: dict) -> pyarrow.Array:
+    """
+    Generate a value in value_range for each row in row_numbers using distribution. state is used to continue the
+    random walk and the current step across record batches.
+    """
+    low, high = value_range
+    num_rows = len(row_numbers)
+
+    # An empty record batch does not change the state.
+    if num_rows == 0:
+        return pyarrow.array([], pyarrow.float32())
+
+    if distribution == "noise":
+        values = rng.integers(low, high, num_rows).astype(numpy.float32)
+    elif distribution == "random_walk":
+        steps = rng.normal(0.0, (high - low) / 100, num_rows)
+        values = numpy.clip(state.get("last_value", (low + high) / 2) + numpy.cumsum(steps), low, high)
+        state["last_value"] = values[-1]
+    elif distribution == "sine":
+        amplitude = (high - low) / 2
+        values = low + amplitude + amplitude * numpy.sin(2 * numpy.pi * row_numbers / SINE_PERIOD_IN_ROWS)
+    elif distribution == "step":
+        step_indices = row_numbers // STEP_LENGTH_IN_ROWS
+        levels = rng.integers(low, high, step_indices[-1] - step_indices[0] + 1).astype(numpy.float32)
+        if state.get("last_step_index") == step_indices[0]:
+            levels[0] = state["last_level"]
+        values = levels[step_indices - step_indices[0]]
+        state["last_step_index"] = step_indices[-1]
+        state["last_level"] = levels[-1]
+    else:
+        raise ValueError(f"Unsupported distribution: {distribution}")
+
+    return pyarrow.array(values.astype(numpy.float32, copy=False))
+
+
+def get_time_series_table_schema(num_fields: int = 3) -> pyarrow.Schema:
+    """
+    Return a schema for a time series table with one timestamp column, three tag columns, and num_fields field
+    columns.
+    """
+    field_names = list(FIELD_VALUE_RANGES)[:num_fields]
+    field_names.extend(f"field_{index}" for index in range(len(field_names), num_fields))
 
-def get_time_series_table_schema() -> pyarrow.Schema:
-    """Return a schema for a time series table with one timestamp column, three tag columns, and three field columns."""
     return pyarrow.schema([
         ("location", pyarrow.string_view()),
         ("install_year", pyarrow.string_view()),
         ("model", pyarrow.string_view()),
         ("timestamp", pyarrow.timestamp("us")),
-        ("power_output", pyarrow.float32()),
-        ("wind_speed", pyarrow.float32()),
-        ("temperature", pyarrow.float32()),
+        *[(field_name, pyarrow.float32()) for field_name in field_names],
     ])
 
 
@@ -122,14 +236,15 @@ def ingest_into_server_and_query_table(server_client: ModelarDBServerFlightClien
     """
     record_batch = create_record_batch(num_rows)
 
-    print(f"Ingesting data into {table_name}...\n")
-    server_client.do_put(table_name, record_batch)
+    print(f"Ingesting data into {table_name}...")
+    statistics = server_client.do_put(table_name, record_batch)
+    print(f"Sent {statistics}\n")
 
     print("Flushing memory of the node...\n")
     server_client.do_action("FlushMemory", b"")
 
     print(f"First five rows of {table_name}:")
-    server_client.do_get(Ticket(f"SELECT * FROM {table_name} LIMIT 5"))
+    server_client.do_get(Ticket(f"SELECT * FROM {table_name} LIMIT 5"), PrintSink())
 
 
 def clean_up_tables(server_client: ModelarDBServerFlightClient, tables: list[str],
@@ -1,40 +1,211 @@
-import pyarrow
-import pprint
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
 
+import pyarrow
 from pyarrow import flight, Schema
 from pyarrow._flight import FlightInfo, ActionType, Result, Ticket
 
+from pool import FlightClientPool, create_flight_client
+from sinks import ResultSink
 
-class _BearerTokenMiddlewareFactory(flight.ClientMiddlewareFactory):
-    """Creates middleware that attaches a Bearer token to every outgoing call."""
 
-    def __init__(self, token: str, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._token = token
+# Metadata sent without a record batch to make the server fail a do_put call that is aborted.
+ABORT_PUT_METADATA = b"abort"
 
-    def start_call(self, _info) -> flight.ClientMiddleware:
-        return _BearerTokenMiddleware(self._token)
 
+@dataclass
+class PutStatistics:
+    """Number of rows and bytes sent by a do_put stream and the number of seconds it took."""
 
-class _BearerTokenMiddleware(flight.ClientMiddleware):
-    """Adds 'authorization: Bearer <token>' to the outgoing request headers."""
+    rows: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
 
-    def __init__(self, token: str, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._token = token
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.rows} rows and {self.bytes} bytes in {self.seconds:.3f} seconds "
+                f"({self.rows_per_second():.0f} rows/s, {self.bytes_per_second() / 1024 / 1024:.2f} MiB/s)")
+
+
+def rechunk_batches(record_batches: Iterable[pyarrow.RecordBatch], max_chunk_rows: int | None = None,
+                    max_chunk_bytes: int | None = None) -> Iterator[pyarrow.RecordBatch]:
+    """
+    Re-chunk record_batches so each yielded record batch has at most max_chunk_rows rows and at most max_chunk_bytes
+    bytes. Small record batches are combined and large record batches are sliced. If no limit is given, the record
+    batches are yielded unchanged.
+    """
+    if max_chunk_rows is None and max_chunk_bytes is None:
+        yield from record_batches
+        return
+
+    pending_record_batches = []
+    pending_rows = 0
+
+    for record_batch in record_batches:
+        row_limit = _chunk_row_limit(record_batch, max_chunk_rows, max_chunk_bytes)
+        offset = 0
+
+        while offset < record_batch.num_rows:
+            if pending_rows >= row_limit:
+                yield pyarrow.concat_batches(pending_record_batches)
+                pending_record_batches = []
+                pending_rows = 0
+
+            length = min(row_limit - pending_rows, record_batch.num_rows - offset)
+            pending_record_batches.append(record_batch.slice(offset, length))
+            pending_rows += length
+            offset += length
+
+    if pending_record_batches:
+        yield pyarrow.concat_batches(pending_record_batches)
+
+
+def _chunk_row_limit(record_batch: pyarrow.RecordBatch, max_chunk_rows: int | None,
+                     max_chunk_bytes: int | None) -> int:
+    """Return the maximum number of rows from record_batch that can be put in a chunk without exceeding the limits."""
+    row_limit = max_chunk_rows if max_chunk_rows is not None else record_batch.num_rows
+
+    if max_chunk_bytes is not None and record_batch.num_rows > 0:
+        bytes_per_row = max(1, record_batch.nbytes // record_batch.num_rows)
+        row_limit = min(row_limit, max_chunk_bytes // bytes_per_row)
+
+    return max(1, row_limit)
+
+
+def put_batches(flight_client: flight.FlightClient, table_name: str, schema: Schema,
+                record_batches: Iterable[pyarrow.RecordBatch], max_chunk_rows: int | None = None,
+                max_chunk_bytes: int | None = None, max_batches_in_flight: int = 4) -> PutStatistics:
+    """
+    Write record_batches to table_name in a single do_put stream. The record batches are re-chunked according to
+    max_chunk_rows and max_chunk_bytes and produced on a separate thread, so the next record batch is read while the
+    current record batch is sent. At most max_batches_in_flight record batches are buffered between the two threads.
+    """
+    batch_queue = queue.Queue(maxsize=max(1, max_batches_in_flight))
+    stop_producing = threading.Event()
+    end_of_stream = object()
+    producer_error = []
+
+    def produce():
+        try:
+            for record_batch in rechunk_batches(record_batches, max_chunk_rows, max_chunk_bytes):
+                if not put_unless_stopped(batch_queue, record_batch, stop_producing):
+                    return
+        except BaseException as error:
+            producer_error.append(error)
+        finally:
+            put_unless_stopped(batch_queue, end_of_stream, stop_producing)
+
+    statistics = PutStatistics()
+    start_time = time.perf_counter()
 
-    def sending_headers(self) -> dict[str, str]:
-        return {"authorization": f"Bearer {self._token}"}
+    upload_descriptor = flight.FlightDescriptor.for_path(table_name)
+    writer, _ = flight_client.do_put(upload_descriptor, schema)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while (record_batch := batch_queue.get()) is not end_of_stream:
+            writer.write_batch(record_batch)
+            statistics.rows += record_batch.num_rows
+            statistics.bytes += record_batch.nbytes
+    except BaseException:
+        abort_put(writer)
+        raise
+    finally:
+        stop_producing.set()
+        producer.join()
+
+    if producer_error:
+        abort_put(writer)
+        raise producer_error[0]
+
+    writer.close()
+    statistics.seconds = time.perf_counter() - start_time
+    return statistics
+
+
+def abort_put(writer: flight.FlightStreamWriter) -> None:
+    """
+    End the do_put stream written to by writer without a normal end of stream, so the server does not treat it as
+    complete. pyarrow cannot cancel a do_put call, so a message that only contains metadata is sent before the writer
+    is closed, which makes the server fail the call as the message cannot be converted to a record batch. Errors are
+    ignored as the call is expected to fail.
+    """
+    try:
+        writer.write_metadata(ABORT_PUT_METADATA)
+        writer.close()
+    except pyarrow.ArrowException:
+        pass
+
+
+def put_unless_stopped(batch_queue: queue.Queue, item: object, stop: threading.Event) -> bool:
+    """Put item in batch_queue while respecting its bound. Return False if stop is set before there is room."""
+    while not stop.is_set():
+        try:
+            batch_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+
+    return False
+
+
+def write_to_sink(sink: ResultSink | None, schema: Schema, record_batches: Iterable[pyarrow.RecordBatch]) -> None:
+    """Write record_batches with schema to sink if one is given, otherwise they are consumed and discarded."""
+    if sink is None:
+        for _record_batch in record_batches:
+            pass
+        return
+
+    sink.open(schema)
+    try:
+        for record_batch in record_batches:
+            sink.write_batch(record_batch)
+    finally:
+        sink.close()
 
 
 class FlightClientWrapper:
     """Wrapper around the FlightClient class to simplify interaction with an Apache Arrow Flight server."""
 
-    def __init__(self, location: str, token: str | None = None):
+    def __init__(self, location: str, token: str | None = None, pool: FlightClientPool | None = None):
+        self._location = location
         self._token = token
+        self._owns_flight_client = pool is None
+
+        # Clients for the locations followed from this client, e.g., endpoint locations, are always pooled.
+        self._pool = pool if pool else FlightClientPool()
+
+        if pool:
+            self._flight_client = pool.acquire(location, token)
+        else:
+            self._flight_client = create_flight_client(location, token)
+
+    @property
+    def flight_client(self) -> flight.FlightClient:
+        """
+        The FlightClient for the location. If it is shared through a pool given by the caller, it is acquired from the
+        pool on every use, so it is replaced if the pool has evicted and closed it.
+        """
+        if not self._owns_flight_client:
+            self._flight_client = self._pool.acquire(self._location, self._token)
 
-        middleware = [_BearerTokenMiddlewareFactory(token)] if token else []
-        self.flight_client = flight.FlightClient(location, middleware=middleware)
+        return self._flight_client
+
+    def close(self) -> None:
+        """Close the client unless it is shared through a pool given by the caller."""
+        if self._owns_flight_client:
+            self._flight_client.close()
+            self._pool.close()
 
     def list_flights(self) -> list[FlightInfo]:
         """Wrapper around the list_flights method of the FlightClient class."""
@@ -49,20 +220,31 @@ class FlightClientWrapper:
 
         return response.schema
 
-    def do_get(self, ticket: Ticket) -> None:
-        """Wrapper around the do_get method of the FlightClient class."""
+    def do_get(self, ticket: Ticket, sink: ResultSink | None = None) -> None:
+        """
+        Wrapper around the do_get method of the FlightClient class. The record batches in the result are written to
+        sink as they are received. If no sink is given, the result is consumed and discarded.
+        """
+        response = self.flight_client.do_get(ticket)
+        write_to_sink(sink, response.schema, (chunk.data for chunk in response))
+
+    def do_get_batches(self, ticket: Ticket) -> Iterator[pyarrow.RecordBatch]:
+        """Wrapper around the do_get method of the FlightClient class that yields the record batches as received."""
         response = self.flight_client.do_get(ticket)
 
-        for batch in response:
-            pprint.pprint(batch.data.to_pydict())
+        for chunk in response:
+            yield chunk.data
 
-    def do_put(self, table_name: str, record_batch: pyarrow.RecordBatch) -> None:
+    def do_put(self, table_name: str, record_batch: pyarrow.RecordBatch) -> PutStatistics:
         """Wrapper around the do_put method of the FlightClient class."""
-        upload_descriptor = flight.FlightDescriptor.for_path(table_name)
-        writer, _ = self.flight_client.do_put(upload_descriptor, record_batch.schema)
+        return self.do_put_batches(table_name, record_batch.schema, [record_batch])
 
-        writer.write(record_batch)
-        writer.close()
+    def do_put_batches(self, table_name: str, schema: Schema, record_batches: Iterable[pyarrow.RecordBatch],
+                       max_chunk_rows: int | None = None, max_chunk_bytes: int | None = None,
+                       max_batches_in_flight: int = 4) -> PutStatistics:
+        """Wrapper around the do_put method of the FlightClient class that streams record_batches, see put_batches."""
+        return put_batches(self.flight_client, table_name, schema, record_batches, max_chunk_rows, max_chunk_bytes,
+                           max_batches_in_flight)
 
     def do_action(self, action_type: str, action_body: bytes) -> list[Result]:
         """Wrapper around the do_action method of the FlightClient class."""
@@ -1,11 +1,40 @@
 import os
 import sys
 import glob
+import json
+import time
+import queue
+import argparse
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
 
 import pyarrow
 from pyarrow import parquet
 from pyarrow import flight
-from pyarrow import compute
+
+# The streaming do_put implementation is shared with the Apache Arrow Flight tester.
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        "Apache-Arrow-Flight-Tester",
+    )
+)
+from wrapper import put_batches, PutStatistics
+
+# Marks that no more items will be added to a queue.
+END_OF_QUEUE = object()
+
+
+class IngestionAborted(Exception):
+    """Raised by a do_put stream when another part of the ingestion failed."""
+
+
+# The schema to cast a file to and if casting is necessary. Plans are cached
+# by the fingerprint of the file's schema as files often share schemas.
+CastPlan = collections.namedtuple("CastPlan", ["schema", "needs_cast"])
+CAST_PLANS = {}
 
 
 # Helper Functions.
@@ -37,20 +66,12 @@ def create_time_series_table(flight_client, table_name, schema, error_bound):
     return list(result)
 
 
-def read_parquet_file_or_folder(path):
-    # Read Apache Parquet file or folder.
-    arrow_table = parquet.read_table(path)
-
+def cast_schema(schema):
     # Ensure the schema only uses supported types.
-    arrays = []
     fields = []
-
-    for field in arrow_table.schema:
-        column = arrow_table[field.name]
-
+    for field in schema:
         if field.type in [pyarrow.float16(), pyarrow.float64()]:
             # Ensure fields are float32 as others are not supported.
-            column = compute.cast(column, pyarrow.float32())
             fields.append(pyarrow.field(field.name, pyarrow.float32()))
         elif field.type in [
             pyarrow.timestamp("s"),
@@ -58,56 +79,637 @@ def read_parquet_file_or_folder(path):
             pyarrow.timestamp("ns"),
         ]:
             # Ensure timestamps are timestamp[us] as others are not supported.
-            column = compute.cast(column, pyarrow.timestamp("us"))
             fields.append(pyarrow.field(field.name, pyarrow.timestamp("us")))
         else:
             fields.append(field)
 
-        arrays.append(column)
+    return pyarrow.schema(fields)
 
-    # Create a new table with the supported types.
-    return pyarrow.Table.from_arrays(arrays, schema=pyarrow.schema(fields))
 
+def cast_plan(schema):
+    fingerprint = schema.remove_metadata().serialize().to_pybytes()
+    plan = CAST_PLANS.get(fingerprint)
 
-def do_put_arrow_table(flight_client, table_name, arrow_table):
-    upload_descriptor = flight.FlightDescriptor.for_path(table_name)
-    writer, _ = flight_client.do_put(upload_descriptor, arrow_table.schema)
-    writer.write(arrow_table)
-    writer.close()
+    if plan is None:
+        supported_schema = cast_schema(schema)
+        needs_cast = not supported_schema.equals(schema, check_metadata=False)
+        plan = CastPlan(supported_schema, needs_cast)
+        CAST_PLANS[fingerprint] = plan
 
+    return plan
 
-# Main Function.
-if __name__ == "__main__":
-    if len(sys.argv) != 4 and len(sys.argv) != 5:
-        print(
-            f"usage: {sys.argv[0]} host time_series_table_name parquet_file_or_folder [relative_error_bound]"
-        )
-        sys.exit(1)
 
-    flight_client = flight.FlightClient(f"grpc://{sys.argv[1]}")
-    table_name = sys.argv[2]
-    error_bound = sys.argv[4] if len(sys.argv) == 5 else "0.0"
+def list_parquet_files(parquet_file_or_folder):
+    if os.path.isdir(parquet_file_or_folder):
+        parquet_files = glob.glob(parquet_file_or_folder + os.sep + "*.parquet")
+        if not parquet_files:
+            raise ValueError(f"no Apache Parquet files in {parquet_file_or_folder}")
 
-    if os.path.isdir(sys.argv[3]):
-        parquet_files = glob.glob(sys.argv[3] + os.sep + "*.parquet")
         parquet_files.sort()  # Makes ingestion order more intuitive.
-    elif os.path.isfile(sys.argv[3]):
-        parquet_files = [sys.argv[3]]
+        return parquet_files
+    elif os.path.isfile(parquet_file_or_folder):
+        return [parquet_file_or_folder]
     else:
         raise ValueError("parquet_file_or_folder is not a file or a folder")
 
-    arrow_table = read_parquet_file_or_folder(parquet_files[0])
-    if not table_exists(flight_client, table_name):
-        create_time_series_table(
-            flight_client, table_name, arrow_table.schema, error_bound
+
+def read_footers(parquet_files, workers):
+    # Only the footers are read, so all files can be checked before any data is
+    # sent and the footers can be reused when the files are read.
+    with ThreadPoolExecutor(max(1, workers)) as executor:
+        all_metadata = list(executor.map(parquet.read_metadata, parquet_files))
+
+    footers = {}
+    for parquet_file, metadata in zip(parquet_files, all_metadata):
+        plan = cast_plan(metadata.schema.to_arrow_schema())
+        footers[parquet_file] = (metadata, plan)
+
+    return footers
+
+
+def check_schemas_are_compatible(footers):
+    # All files must have the same schema after casting to the supported types.
+    first_parquet_file, (_metadata, first_plan) = next(iter(footers.items()))
+    incompatible_parquet_files = [
+        parquet_file
+        for parquet_file, (_metadata, plan) in footers.items()
+        if not plan.schema.equals(first_plan.schema, check_metadata=False)
+    ]
+
+    if incompatible_parquet_files:
+        raise ValueError(
+            f"{len(incompatible_parquet_files)} files have a schema that is not "
+            f"compatible with {first_parquet_file}, e.g., {incompatible_parquet_files[0]}"
+        )
+
+    return first_plan.schema
+
+
+def read_parquet_file_or_folder(path):
+    # Read Apache Parquet file or folder.
+    arrow_table = parquet.read_table(path)
+
+    # Create a new table with the supported types.
+    return arrow_table.cast(cast_plan(arrow_table.schema).schema)
+
+
+def read_parquet_batches(path, batch_size, row_groups=None, footer=None):
+    # Read the Apache Parquet file one batch at a time so the amount of memory
+    # used is bounded by batch_size instead of the size of the file. If
+    # row_groups is given, only those row groups are read. If footer is given,
+    # the file's metadata and cast plan are not computed again.
+    if footer is None:
+        metadata = parquet.read_metadata(path)
+        footer = (metadata, cast_plan(metadata.schema.to_arrow_schema()))
+
+    metadata, plan = footer
+    parquet_file = parquet.ParquetFile(path, metadata=metadata)
+
+    for record_batch in parquet_file.iter_batches(
+        batch_size=batch_size, row_groups=row_groups
+    ):
+        # Cast each batch to the supported types as it is read.
+        yield record_batch.cast(plan.schema) if plan.needs_cast else record_batch
+
+
+def do_put_parquet_file(
+    flight_client,
+    table_name,
+    path,
+    batch_size,
+    chunk_options,
+    row_groups=None,
+    footer=None,
+):
+    record_batches = read_parquet_batches(path, batch_size, row_groups, footer)
+    schema = footer[1].schema if footer else cast_schema(parquet.read_schema(path))
+    return put_batches(
+        flight_client, table_name, schema, record_batches, **chunk_options
+    )
+
+
+def ingest_in_parallel(
+    host,
+    table_name,
+    files_and_row_groups,
+    footers,
+    batch_size,
+    decode_workers,
+    put_streams,
+    preserve_file_order,
+    chunk_options,
+    verbose=True,
+):
+    # Files are decoded by decode_workers threads and the decoded batches are
+    # sent by put_streams do_put streams, each with its own client connection.
+    # If the order of each file must be preserved, each file is given its own
+    # queue which is consumed in order by a single do_put stream, otherwise the
+    # batches of all files are shared between all of the do_put streams.
+    schema = footers[files_and_row_groups[0][0]][1].schema
+    queue_size = chunk_options["max_batches_in_flight"]
+    file_queue = queue.Queue()
+    batch_queue = queue.Queue(maxsize=max(1, queue_size) * put_streams)
+    aborted = threading.Event()
+
+    for index, (parquet_file, row_groups) in enumerate(files_and_row_groups):
+        file_queue.put((index, parquet_file, row_groups))
+
+    def decode():
+        while not aborted.is_set():
+            try:
+                index, parquet_file, row_groups = file_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if verbose:
+                print_progress(
+                    parquet_file, row_groups, index, len(files_and_row_groups)
+                )
+            record_batches = read_parquet_batches(
+                parquet_file, batch_size, row_groups, footers[parquet_file]
+            )
+            # The rest of the file is not decoded if the ingestion is aborted.
+            if preserve_file_order:
+                file_batch_queue = queue.Queue(maxsize=max(1, queue_size))
+                if not put_unless_aborted(batch_queue, file_batch_queue, aborted):
+                    return
+                for record_batch in record_batches:
+                    if not put_unless_aborted(file_batch_queue, record_batch, aborted):
+                        return
+                put_unless_aborted(file_batch_queue, END_OF_QUEUE, aborted)
+            else:
+                for record_batch in record_batches:
+                    if not put_unless_aborted(batch_queue, record_batch, aborted):
+                        return
+
+    def decoded_batches():
+        while (item := get_unless_aborted(batch_queue, aborted)) is not END_OF_QUEUE:
+            if preserve_file_order:
+                while (
+                    record_batch := get_unless_aborted(item, aborted)
+                ) is not END_OF_QUEUE:
+                    yield record_batch
+            else:
+                yield item
+
+        # An abort must not be seen as the end of the stream, as the do_put
+        # stream would then end normally with only part of the data.
+        if aborted.is_set():
+            raise IngestionAborted("another decoder or do_put stream failed")
+
+    def send():
+        flight_client = flight.FlightClient(f"grpc://{host}")
+        try:
+            return put_batches(
+                flight_client, table_name, schema, decoded_batches(), **chunk_options
+            )
+        except BaseException:
+            aborted.set()
+            raise
+        finally:
+            flight_client.close()
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(put_streams) as senders, ThreadPoolExecutor(
+        decode_workers
+    ) as decoders:
+        send_futures = [senders.submit(send) for _ in range(put_streams)]
+        decode_futures = [decoders.submit(decode) for _ in range(decode_workers)]
+
+        try:
+            for decode_future in decode_futures:
+                decode_future.result()
+        except BaseException:
+            aborted.set()
+            raise
+        finally:
+            for _ in range(put_streams):
+                put_unless_aborted(batch_queue, END_OF_QUEUE, aborted)
+
+        # The error that caused the other do_put streams to abort is raised.
+        errors = [
+            send_future.exception()
+            for send_future in send_futures
+            if send_future.exception()
+        ]
+        if errors:
+            raise next(
+                (error for error in errors if not isinstance(error, IngestionAborted)),
+                errors[0],
+            )
+
+        all_statistics = [send_future.result() for send_future in send_futures]
+
+    return PutStatistics(
+        sum(statistics.rows for statistics in all_statistics),
+        sum(statistics.bytes for statistics in all_statistics),
+        time.perf_counter() - start_time,
+    )
+
+
+def ingest_files_and_row_groups(
+    flight_client,
+    host,
+    table_name,
+    files_and_row_groups,
+    footers,
+    batch_size,
+    decode_workers,
+    put_streams,
+    preserve_file_order,
+    chunk_options,
+    verbose=True,
+):
+    if decode_workers == 1 and put_streams == 1:
+        statistics = PutStatistics()
+        for index, (parquet_file, row_groups) in enumerate(files_and_row_groups):
+            if verbose:
+                print_progress(
+                    parquet_file, row_groups, index, len(files_and_row_groups)
+                )
+            file_statistics = do_put_parquet_file(
+                flight_client,
+                table_name,
+                parquet_file,
+                batch_size,
+                chunk_options,
+                row_groups,
+                footers[parquet_file],
+            )
+            if verbose:
+                print(f"  Sent {file_statistics}")
+
+            statistics.rows += file_statistics.rows
+            statistics.bytes += file_statistics.bytes
+            statistics.seconds += file_statistics.seconds
+    else:
+        statistics = ingest_in_parallel(
+            host,
+            table_name,
+            files_and_row_groups,
+            footers,
+            batch_size,
+            decode_workers,
+            put_streams,
+            preserve_file_order,
+            chunk_options,
+            verbose,
         )
+        if verbose:
+            print(f"- Sent {statistics}")
+
+    return statistics
+
+
+def ingest(
+    host,
+    table_name,
+    source,
+    error_bound="0.0",
+    batch_size=65536,
+    decode_workers=1,
+    put_streams=1,
+    preserve_file_order=False,
+    max_chunk_rows=None,
+    max_chunk_bytes=None,
+    max_batches_in_flight=4,
+    verbose=False,
+):
+    # Ingest source into the time series table table_name on the server at host
+    # and flush it to disk. The time series table is created with error_bound if
+    # it does not exist. source is either the path to an Apache Parquet file or
+    # folder, a pyarrow.Table, or a pyarrow.RecordBatchReader, so data sets that
+    # are already in memory or are streamed are not read from disk again. The
+    # number of rows and bytes ingested and the number of seconds it took,
+    # including creating the table and flushing, is returned. Errors are raised
+    # as exceptions, e.g., ValueError and pyarrow.flight.FlightError.
+    start_time = time.perf_counter()
+    chunk_options = {
+        "max_chunk_rows": max_chunk_rows,
+        "max_chunk_bytes": max_chunk_bytes,
+        "max_batches_in_flight": max_batches_in_flight,
+    }
+
+    flight_client = flight.FlightClient(f"grpc://{host}")
+    try:
+        if isinstance(source, str):
+            parquet_files = list_parquet_files(source)
+            footers = read_footers(parquet_files, decode_workers)
+            schema = check_schemas_are_compatible(footers)
+            create_time_series_table_if_missing(
+                flight_client, table_name, schema, error_bound
+            )
 
-    for index, parquet_file in enumerate(parquet_files):
-        print(f"- Processing {parquet_file} ({index + 1} of {len(parquet_files)})")
-        arrow_table = read_parquet_file_or_folder(parquet_file)
-        do_put_arrow_table(flight_client, table_name, arrow_table)
+            files_and_row_groups = [(parquet_file, None) for parquet_file in footers]
+            statistics = ingest_files_and_row_groups(
+                flight_client,
+                host,
+                table_name,
+                files_and_row_groups,
+                footers,
+                batch_size,
+                decode_workers,
+                put_streams,
+                preserve_file_order,
+                chunk_options,
+                verbose,
+            )
+        elif isinstance(source, (pyarrow.Table, pyarrow.RecordBatchReader)):
+            plan = cast_plan(source.schema)
+            create_time_series_table_if_missing(
+                flight_client, table_name, plan.schema, error_bound
+            )
 
+            record_batches = (
+                record_batch.cast(plan.schema) if plan.needs_cast else record_batch
+                for record_batch in (
+                    source.to_batches(max_chunksize=batch_size)
+                    if isinstance(source, pyarrow.Table)
+                    else source
+                )
+            )
+            statistics = put_batches(
+                flight_client, table_name, plan.schema, record_batches, **chunk_options
+            )
+        else:
+            raise TypeError(f"Unsupported source: {type(source).__name__}")
+
+        flush_memory(flight_client)
+    finally:
+        flight_client.close()
+
+    statistics.seconds = time.perf_counter() - start_time
+    return statistics
+
+
+def print_progress(parquet_file, row_groups, index, count):
+    print(
+        f"- Processing {parquet_file} row groups {row_groups} ({index + 1} of {count})"
+    )
+
+
+def put_unless_aborted(bounded_queue, item, aborted):
+    # Return False if aborted is set before there is room for item.
+    while not aborted.is_set():
+        try:
+            bounded_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+
+    return False
+
+
+def get_unless_aborted(bounded_queue, aborted):
+    while not aborted.is_set():
+        try:
+            return bounded_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+    return END_OF_QUEUE
+
+
+def read_manifest(manifest_path, table_name):
+    # The manifest records which row groups of each file have been durably
+    # ingested, i.e., they have been sent and FlushMemory has succeeded.
+    if not os.path.exists(manifest_path):
+        return {"table_name": table_name, "files": {}}
+
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest["table_name"] != table_name:
+        raise ValueError(
+            f"{manifest_path} is for {manifest['table_name']} and not {table_name}"
+        )
+    return manifest
+
+
+def write_manifest(manifest_path, manifest):
+    # The manifest is replaced atomically so it is never partially written.
+    temporary_manifest_path = manifest_path + ".tmp"
+    with open(temporary_manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+        manifest_file.flush()
+        os.fsync(manifest_file.fileno())
+    os.replace(temporary_manifest_path, manifest_path)
+
+
+def list_row_groups_to_ingest(footers, manifest):
+    # Only the footers are used to list the row groups not yet ingested.
+    row_groups_to_ingest = []
+    for parquet_file, (metadata, _plan) in footers.items():
+        entry = manifest_entry(manifest, parquet_file, metadata)
+
+        for row_group in range(metadata.num_row_groups):
+            if row_group not in entry["ingested_row_groups"]:
+                row_group_metadata = metadata.row_group(row_group)
+                row_groups_to_ingest.append(
+                    (
+                        parquet_file,
+                        row_group,
+                        row_group_metadata.num_rows,
+                        row_group_metadata.total_byte_size,
+                    )
+                )
+
+    return row_groups_to_ingest
+
+
+def manifest_entry(manifest, parquet_file, metadata):
+    # A file that has changed since some of it was ingested cannot be resumed.
+    key = os.path.abspath(parquet_file)
+    stat = os.stat(parquet_file)
+    entry = manifest["files"].get(key)
+
+    if entry and (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+        if entry["ingested_row_groups"]:
+            raise ValueError(f"{parquet_file} has changed since it was ingested")
+        entry = None
+
+    if not entry:
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "num_row_groups": metadata.num_row_groups,
+            "ingested_row_groups": [],
+        }
+        manifest["files"][key] = entry
+
+    return entry
+
+
+def split_into_checkpoints(row_groups_to_ingest, checkpoint_rows, checkpoint_bytes):
+    # Each checkpoint contains row groups until either limit is reached.
+    checkpoints = [[]]
+    rows = 0
+    size_in_bytes = 0
+
+    for row_group_to_ingest in row_groups_to_ingest:
+        if checkpoints[-1] and (
+            (checkpoint_rows and rows >= checkpoint_rows)
+            or (checkpoint_bytes and size_in_bytes >= checkpoint_bytes)
+        ):
+            checkpoints.append([])
+            rows = 0
+            size_in_bytes = 0
+
+        checkpoints[-1].append(row_group_to_ingest)
+        rows += row_group_to_ingest[2]
+        size_in_bytes += row_group_to_ingest[3]
+
+    return checkpoints
+
+
+def group_row_groups_by_file(checkpoint):
+    files_and_row_groups = []
+    for parquet_file, row_group, _rows, _size_in_bytes in checkpoint:
+        if files_and_row_groups and files_and_row_groups[-1][0] == parquet_file:
+            files_and_row_groups[-1][1].append(row_group)
+        else:
+            files_and_row_groups.append((parquet_file, [row_group]))
+
+    return files_and_row_groups
+
+
+def create_time_series_table_if_missing(flight_client, table_name, schema, error_bound):
+    if not table_exists(flight_client, table_name):
+        create_time_series_table(flight_client, table_name, schema, error_bound)
+
+
+def flush_memory(flight_client):
     # Flush the data to disk.
     action = flight.Action("FlushMemory", b"")
     result = flight_client.do_action(action)
-    print(list(result))
+    return list(result)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("host")
+    parser.add_argument("time_series_table_name")
+    parser.add_argument("parquet_file_or_folder")
+    parser.add_argument("relative_error_bound", nargs="?", default="0.0")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=65536,
+        help="maximum number of rows read from the Apache Parquet files at a time",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="maximum number of rows in each record batch sent to the server",
+    )
+    parser.add_argument(
+        "--chunk-bytes",
+        type=int,
+        help="maximum number of bytes in each record batch sent to the server",
+    )
+    parser.add_argument(
+        "--batches-in-flight",
+        type=int,
+        default=4,
+        help="maximum number of record batches buffered while the current one is sent",
+    )
+    parser.add_argument(
+        "--decode-workers",
+        type=int,
+        default=1,
+        help="number of threads decoding Apache Parquet files in parallel",
+    )
+    parser.add_argument(
+        "--put-streams",
+        type=int,
+        default=1,
+        help="number of concurrent do_put streams, each with its own connection",
+    )
+    parser.add_argument(
+        "--preserve-file-order",
+        action="store_true",
+        help="send all batches of a file in order through a single do_put stream",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="file recording which row groups have been durably ingested",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the row groups that the manifest records as ingested",
+    )
+    parser.add_argument(
+        "--checkpoint-rows",
+        type=int,
+        help="flush and update the manifest after this many rows",
+    )
+    parser.add_argument(
+        "--checkpoint-bytes",
+        type=int,
+        help="flush and update the manifest after this many uncompressed bytes",
+    )
+    arguments = parser.parse_args()
+
+    if arguments.resume and not arguments.manifest:
+        parser.error("--resume requires --manifest")
+
+    return arguments
+
+
+# Main Function.
+if __name__ == "__main__":
+    arguments = parse_arguments()
+
+    flight_client = flight.FlightClient(f"grpc://{arguments.host}")
+    table_name = arguments.time_series_table_name
+    error_bound = arguments.relative_error_bound
+    chunk_options = {
+        "max_chunk_rows": arguments.chunk_rows,
+        "max_chunk_bytes": arguments.chunk_bytes,
+        "max_batches_in_flight": arguments.batches_in_flight,
+    }
+
+    parquet_files = list_parquet_files(arguments.parquet_file_or_folder)
+
+    # The footers of all files are read and checked before any data is sent.
+    footers = read_footers(parquet_files, arguments.decode_workers)
+    schema = check_schemas_are_compatible(footers)
+    create_time_series_table_if_missing(flight_client, table_name, schema, error_bound)
+
+    if arguments.manifest and arguments.resume:
+        manifest = read_manifest(arguments.manifest, table_name)
+    else:
+        manifest = {"table_name": table_name, "files": {}}
+
+    row_groups_to_ingest = list_row_groups_to_ingest(footers, manifest)
+    checkpoints = split_into_checkpoints(
+        row_groups_to_ingest, arguments.checkpoint_rows, arguments.checkpoint_bytes
+    )
+
+    for index, checkpoint in enumerate(checkpoints):
+        if len(checkpoints) > 1:
+            print(f"Checkpoint {index + 1} of {len(checkpoints)}")
+
+        files_and_row_groups = group_row_groups_by_file(checkpoint)
+        if files_and_row_groups:
+            ingest_files_and_row_groups(
+                flight_client,
+                arguments.host,
+                table_name,
+                files_and_row_groups,
+                footers,
+                arguments.batch_size,
+                arguments.decode_workers,
+                arguments.put_streams,
+                arguments.preserve_file_order,
+                chunk_options,
+            )
+        print(flush_memory(flight_client))
+
+        # The row groups are only recorded as ingested after the flush succeeds.
+        if arguments.manifest:
+            for parquet_file, row_group, _rows, _size_in_bytes in checkpoint:
+                entry = manifest["files"][os.path.abspath(parquet_file)]
+                entry["ingested_row_groups"].append(row_group)
+            write_manifest(arguments.manifest, manifest)
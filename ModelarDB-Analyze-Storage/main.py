@@ -1,13 +1,17 @@
 """Script for analyzing how ModelarDB stores different data sets."""
 
 import os
-import sys
+import json
+import hashlib
 import sqlite3
-import tempfile
-from dataclasses import dataclass
+import argparse
+from functools import partial
+from dataclasses import asdict, dataclass
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 import pyarrow
+from pyarrow import compute
 from pyarrow import parquet
 from pyarrow import Table
 
@@ -34,80 +38,275 @@ class Configuration:
         )
 
 
-def list_and_process_files(configuration: Configuration, results: sqlite3.Connection):
-    result_id = 1
+# Compact result of analyzing a file so it can be returned from a process.
+@dataclass
+class FileResult:
+    file_path: str
+    modified_time_ns: int
+    field_column: int
+    rust_size_in_bytes: int
+    python_size_in_bytes: int | None
+    model_types_used: dict[int, int]
+    size_in_bytes_per_column: dict[str, int]
+    uncompressed_size_in_bytes_per_column: dict[str, int]
+
+
+def list_and_process_files(
+    configuration: Configuration,
+    reencode: bool,
+    processes: int,
+    results: sqlite3.Connection,
+):
+    # Only the files that are new or changed since they were analyzed with the
+    # same mode and configuration are analyzed, and deleted files are removed.
+    fingerprint = compute_fingerprint(configuration, reencode)
+    analyzed_files = {
+        file_path: (rust_size_in_bytes, modified_time_ns, file_fingerprint)
+        for (
+            file_path,
+            rust_size_in_bytes,
+            modified_time_ns,
+            file_fingerprint,
+        ) in results.execute(
+            "SELECT file_path, rust_size_in_bytes, modified_time_ns, fingerprint FROM file"
+        )
+    }
+
+    file_paths = []
+    for file_path in list_files(configuration):
+        file_stat = os.stat(file_path)
+        key = (file_stat.st_size, file_stat.st_mtime_ns, fingerprint)
+        if analyzed_files.pop(file_path, None) != key:
+            file_paths.append(file_path)
+    deleted_file_paths = list(analyzed_files)
+
+    analyze_file = partial(
+        measure_file_and_its_columns if reencode else read_file_and_its_columns_sizes,
+        configuration,
+    )
+
+    # The files are independent, so they can be analyzed by a pool of processes
+    # while only the main process writes to the SQLite database.
+    if processes > 1:
+        chunksize = max(1, len(file_paths) // (4 * processes))
+        with ProcessPoolExecutor(processes) as executor:
+            file_results = list(
+                executor.map(analyze_file, file_paths, chunksize=chunksize)
+            )
+    else:
+        file_results = list(map(analyze_file, file_paths))
+
+    delete_and_insert_results(deleted_file_paths, file_results, fingerprint, results)
+    return len(file_results), len(deleted_file_paths)
+
+
+def compute_fingerprint(configuration: Configuration, reencode: bool) -> str:
+    settings = json.dumps([asdict(configuration), reencode], sort_keys=True)
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+
+def list_files(configuration: Configuration) -> list[str]:
+    file_paths = []
     top = configuration.time_series_table_path()
     for dirpath, _dirnames, filenames in os.walk(top):
         for filename in filenames:
-            if not filename.endswith(".parquet"):
-                continue
-
-            file_path = os.path.join(dirpath, filename)
-            measure_file_and_its_columns(configuration, file_path, result_id, results)
-            result_id += 1
+            if filename.endswith(".parquet"):
+                file_paths.append(os.path.join(dirpath, filename))
+    return file_paths
+
+
+def read_file_and_its_columns_sizes(
+    _configuration: Configuration, file_path: str
+) -> FileResult:
+    # The sizes of the column chunks are read from the footer, so only the pages
+    # of model_type_id are decoded to count the model types.
+    file_stat = os.stat(file_path)
+    metadata = parquet.read_metadata(file_path)
+    field_column = parse_field_column(file_path)
+
+    model_type_ids = parquet.read_table(file_path, columns=["model_type_id"])
+    model_types_used = count_model_types(model_type_ids.column("model_type_id"))
+
+    size_in_bytes_per_column = Counter()
+    uncompressed_size_in_bytes_per_column = Counter()
+    for row_group_index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(row_group_index)
+        for column_index in range(row_group.num_columns):
+            column_chunk = row_group.column(column_index)
+            column_name = column_chunk.path_in_schema
+            size_in_bytes_per_column[column_name] += column_chunk.total_compressed_size
+            uncompressed_size_in_bytes_per_column[
+                column_name
+            ] += column_chunk.total_uncompressed_size
+
+    return FileResult(
+        file_path,
+        file_stat.st_mtime_ns,
+        field_column,
+        file_stat.st_size,
+        None,
+        model_types_used,
+        size_in_bytes_per_column,
+        uncompressed_size_in_bytes_per_column,
+    )
 
 
 def measure_file_and_its_columns(
-    configuration: Configuration, file_path: str, result_id, results: sqlite3.Connection
-):
+    configuration: Configuration, file_path: str
+) -> FileResult:
+    file_stat = os.stat(file_path)
     table = parquet.read_table(file_path)
+    field_column = parse_field_column(file_path)
+    (
+        python_size_in_bytes,
+        python_size_in_bytes_per_column,
+    ) = write_table_and_its_columns(configuration, table)
 
-    field_column_str = file_path.split(os.sep)[-2]
-    field_column = int(field_column_str[field_column_str.rfind("=") + 1 :])
+    model_types_used = count_model_types(table.column("model_type_id"))
+
+    return FileResult(
+        file_path,
+        file_stat.st_mtime_ns,
+        field_column,
+        file_stat.st_size,
+        python_size_in_bytes,
+        model_types_used,
+        python_size_in_bytes_per_column,
+        {},
+    )
 
-    rust_size_in_bytes = os.path.getsize(file_path)
-    python_size_in_bytes = write_table(configuration, table)
 
-    model_types_used = Counter()
-    python_size_in_bytes_per_column = Counter()
-    for field in table.schema:
-        column = table.column(field.name)
-        if field.name == "model_type_id":
-            for value in column:
-                model_types_used[value.as_py()] += 1
-
-        column_schema = pyarrow.schema(pyarrow.struct([field]))
-        column_table = Table.from_arrays([column], schema=column_schema)
-        python_size_in_bytes_per_column[field.name] = write_table(
-            configuration, column_table
+def count_model_types(model_type_ids: pyarrow.ChunkedArray) -> dict[int, int]:
+    # The segments are counted by Arrow instead of one Python object at a time.
+    value_counts = compute.value_counts(model_type_ids)
+    return dict(
+        zip(
+            value_counts.field("values").to_pylist(),
+            value_counts.field("counts").to_pylist(),
         )
-
-    _ = results.execute(
-        f"INSERT INTO file VALUES({field_column}, {rust_size_in_bytes}, {python_size_in_bytes})"
     )
-    for model_type_id, segment_count in model_types_used.items():
-        _ = results.execute(
-            f"INSERT INTO model_type_use VALUES({field_column}, {model_type_id}, {segment_count})"
+
+
+def parse_field_column(file_path: str) -> int:
+    field_column_str = file_path.split(os.sep)[-2]
+    return int(field_column_str[field_column_str.rfind("=") + 1 :])
+
+
+def delete_and_insert_results(
+    deleted_file_paths: list[str],
+    file_results: list[FileResult],
+    fingerprint: str,
+    results: sqlite3.Connection,
+):
+    # The sizes that are not known for a mode are stored as NULL.
+    file_rows = []
+    model_type_use_rows = []
+    file_column_rows = []
+    for file_result in file_results:
+        file_path = file_result.file_path
+        field_column = file_result.field_column
+        file_rows.append(
+            (
+                file_path,
+                file_result.modified_time_ns,
+                fingerprint,
+                field_column,
+                file_result.rust_size_in_bytes,
+                file_result.python_size_in_bytes,
+            )
         )
-    for column_index, (column_name, python_size_in_bytes) in enumerate(
-        python_size_in_bytes_per_column.items()
-    ):
-        _ = results.execute(
-            f"INSERT INTO file_column VALUES({field_column}, {column_index}, '{column_name}', {python_size_in_bytes})"
+        for model_type_id, segment_count in file_result.model_types_used.items():
+            model_type_use_rows.append(
+                (file_path, field_column, model_type_id, segment_count)
+            )
+        for column_index, (column_name, size_in_bytes) in enumerate(
+            file_result.size_in_bytes_per_column.items()
+        ):
+            file_column_rows.append(
+                (
+                    file_path,
+                    field_column,
+                    column_index,
+                    column_name,
+                    size_in_bytes,
+                    file_result.uncompressed_size_in_bytes_per_column.get(column_name),
+                )
+            )
+
+    # The results for deleted and changed files are replaced in one transaction.
+    removed_file_paths = [(file_path,) for file_path in deleted_file_paths] + [
+        (file_result.file_path,) for file_result in file_results
+    ]
+    with results:
+        for table_name in ["file", "model_type_use", "file_column"]:
+            results.executemany(
+                f"DELETE FROM {table_name} WHERE file_path = ?", removed_file_paths
+            )
+
+        results.executemany("INSERT INTO file VALUES(?, ?, ?, ?, ?, ?)", file_rows)
+        results.executemany(
+            "INSERT INTO model_type_use VALUES(?, ?, ?, ?)", model_type_use_rows
         )
+        results.executemany(
+            "INSERT INTO file_column VALUES(?, ?, ?, ?, ?, ?)", file_column_rows
+        )
+
 
+def write_table_and_its_columns(
+    configuration: Configuration, table: Table
+) -> tuple[int, dict[str, int]]:
+    # The table and each of its columns are encoded in one pass over the table
+    # to sinks that only count the number of bytes written to them.
+    file_sink = pyarrow.MockOutputStream()
+    file_writer = create_parquet_writer(configuration, file_sink, table.schema)
 
-def write_table(configuration: Configuration, table: Table) -> int:
-    with tempfile.NamedTemporaryFile() as temp_file_path:
-        parquet.write_table(
-            table,
-            temp_file_path.name,
-            data_page_size=configuration.data_page_size,
-            row_group_size=configuration.row_group_size,
-            column_encoding=configuration.column_encoding,
-            compression=configuration.compression,
-            use_dictionary=configuration.use_dictionary,
-            write_statistics=configuration.write_statistics,
+    column_sinks = {}
+    column_writers = {}
+    for field in table.schema:
+        column_sinks[field.name] = pyarrow.MockOutputStream()
+        column_writers[field.name] = create_parquet_writer(
+            configuration, column_sinks[field.name], pyarrow.schema([field])
         )
-        return os.path.getsize(temp_file_path.name)
+
+    # Each slice is written as a row group like parquet.write_table() does.
+    for offset in range(0, table.num_rows, configuration.row_group_size):
+        row_group = table.slice(offset, configuration.row_group_size)
+        file_writer.write_table(row_group)
+        for field in table.schema:
+            column_table = Table.from_arrays(
+                [row_group.column(field.name)], schema=pyarrow.schema([field])
+            )
+            column_writers[field.name].write_table(column_table)
+
+    file_writer.close()
+    size_in_bytes_per_column = {}
+    for field in table.schema:
+        column_writers[field.name].close()
+        size_in_bytes_per_column[field.name] = column_sinks[field.name].size()
+
+    return file_sink.size(), size_in_bytes_per_column
+
+
+def create_parquet_writer(
+    configuration: Configuration, sink: pyarrow.NativeFile, schema: pyarrow.Schema
+) -> parquet.ParquetWriter:
+    return parquet.ParquetWriter(
+        sink,
+        schema,
+        data_page_size=configuration.data_page_size,
+        column_encoding=configuration.column_encoding,
+        compression=configuration.compression,
+        use_dictionary=configuration.use_dictionary,
+        write_statistics=configuration.write_statistics,
+    )
 
 
 def read_column_indices_column_names(
     data_folder: str, time_series_table_name: str
 ) -> dict[int, str]:
     time_series_table_field_columns = parquet.read_table(
-        sys.argv[1] + "/metadata/time_series_table_field_columns",
-        filters=[("table_name", "==", sys.argv[2])],
+        data_folder + "/metadata/time_series_table_field_columns",
+        filters=[("table_name", "==", time_series_table_name)],
     )
     column_indices = time_series_table_field_columns.column("column_index")
     column_names = time_series_table_field_columns.column("column_name")
@@ -128,20 +327,29 @@ def print_results(
     )
     for field_column in field_columns:
         model_types_used = execute_and_return_value(
-            f"SELECT model_type_id, SUM(segment_count) FROM model_type_use WHERE field_column = {field_column} GROUP BY model_type_id ORDER BY model_type_id",
+            "SELECT model_type_id, SUM(segment_count) FROM model_type_use WHERE field_column = ? GROUP BY model_type_id ORDER BY model_type_id",
             results,
+            (field_column,),
         )
         rust_size_in_bytes = execute_and_return_value(
-            f"SELECT SUM(rust_size_in_bytes) FROM file WHERE field_column = {field_column}",
+            "SELECT SUM(rust_size_in_bytes) FROM file WHERE field_column = ?",
             results,
+            (field_column,),
         )
         python_size_in_bytes = execute_and_return_value(
-            f"SELECT SUM(python_size_in_bytes) FROM file WHERE field_column = {field_column}",
+            "SELECT SUM(python_size_in_bytes) FROM file WHERE field_column = ?",
+            results,
+            (field_column,),
+        )
+        size_in_bytes_per_column = execute_and_return_value(
+            "SELECT column_name, SUM(size_in_bytes) FROM file_column WHERE field_column = ? GROUP BY column_index ORDER BY column_index",
             results,
+            (field_column,),
         )
-        python_size_in_bytes_per_column = execute_and_return_value(
-            f"SELECT column_name, SUM(python_size_in_bytes) FROM file_column WHERE field_column = {field_column} GROUP BY column_index ORDER BY column_index",
+        uncompressed_size_in_bytes_per_column = execute_and_return_value(
+            "SELECT column_name, SUM(uncompressed_size_in_bytes) FROM file_column WHERE field_column = ? GROUP BY column_index ORDER BY column_index",
             results,
+            (field_column,),
         )
 
         print_total_size_in_bytes(
@@ -150,21 +358,26 @@ def print_results(
             model_types_used,
             rust_size_in_bytes,
             python_size_in_bytes,
-            python_size_in_bytes_per_column,
+            size_in_bytes_per_column,
+            uncompressed_size_in_bytes_per_column,
         )
 
     model_types_used = execute_and_return_value(
-        f"SELECT model_type_id, SUM(segment_count) FROM model_type_use GROUP BY model_type_id ORDER BY model_type_id",
+        "SELECT model_type_id, SUM(segment_count) FROM model_type_use GROUP BY model_type_id ORDER BY model_type_id",
         results,
     )
     rust_size_in_bytes = execute_and_return_value(
-        f"SELECT SUM(rust_size_in_bytes) FROM file", results
+        "SELECT SUM(rust_size_in_bytes) FROM file", results
     )
     python_size_in_bytes = execute_and_return_value(
-        f"SELECT SUM(python_size_in_bytes) FROM file", results
+        "SELECT SUM(python_size_in_bytes) FROM file", results
     )
-    python_size_in_bytes_per_column = execute_and_return_value(
-        f"SELECT column_name, SUM(python_size_in_bytes) FROM file_column GROUP BY column_index ORDER BY column_index",
+    size_in_bytes_per_column = execute_and_return_value(
+        "SELECT column_name, SUM(size_in_bytes) FROM file_column GROUP BY column_index ORDER BY column_index",
+        results,
+    )
+    uncompressed_size_in_bytes_per_column = execute_and_return_value(
+        "SELECT column_name, SUM(uncompressed_size_in_bytes) FROM file_column GROUP BY column_index ORDER BY column_index",
         results,
     )
 
@@ -174,12 +387,15 @@ def print_results(
         model_types_used,
         rust_size_in_bytes,
         python_size_in_bytes,
-        python_size_in_bytes_per_column,
+        size_in_bytes_per_column,
+        uncompressed_size_in_bytes_per_column,
     )
 
 
-def execute_and_return_value(query: str, results: sqlite3.Connection):
-    cursor = results.execute(query)
+def execute_and_return_value(
+    query: str, results: sqlite3.Connection, parameters: tuple = ()
+):
+    cursor = results.execute(query, parameters)
     values = cursor.fetchall()
     cursor.close()
 
@@ -196,8 +412,9 @@ def print_total_size_in_bytes(
     field_name: str,
     model_types_used: dict[str, int],
     rust_size_in_bytes: int,
-    python_size_in_bytes: int,
-    python_size_in_bytes_per_column: dict[str, int],
+    python_size_in_bytes: int | None,
+    size_in_bytes_per_column: dict[str, int],
+    uncompressed_size_in_bytes_per_column: dict[str, int | None],
 ):
     print(f"Field Column: {field_column} - {field_name}")
     print("------------------------------------------")
@@ -208,13 +425,21 @@ def print_total_size_in_bytes(
     print("------------------------------------------")
 
     summed_size_in_bytes = 0
-    for column, size in python_size_in_bytes_per_column.items():
-        print(f"- {column:<25} {bytes_to_mib(size):>10} MiB")
+    for column, size in size_in_bytes_per_column.items():
+        uncompressed_size = uncompressed_size_in_bytes_per_column[column]
+        if uncompressed_size is None:
+            print(f"- {column:<25} {bytes_to_mib(size):>10} MiB")
+        else:
+            print(
+                f"- {column:<25} {bytes_to_mib(size):>10} MiB"
+                f" ({bytes_to_mib(uncompressed_size)} MiB Uncompressed)"
+            )
         summed_size_in_bytes += size
 
     print("------------------------------------------")
     print(f"- Summed Size {bytes_to_mib(summed_size_in_bytes):>24} MiB")
-    print(f"- Python Size {bytes_to_mib(python_size_in_bytes):>24} MiB")
+    if python_size_in_bytes is not None:
+        print(f"- Python Size {bytes_to_mib(python_size_in_bytes):>24} MiB")
     print(f"- Rust Size {bytes_to_mib(rust_size_in_bytes):>26} MiB")
     print()
 
@@ -223,29 +448,70 @@ def bytes_to_mib(size_in_bytes: int) -> float:
     return round(size_in_bytes / 1024 / 1024, 2)
 
 
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Analyze how ModelarDB stores a time series table."
+    )
+    parser.add_argument("data_folder", help="data folder used by ModelarDB")
+    parser.add_argument("time_series_table_name", help="time series table to analyze")
+    parser.add_argument(
+        "--reencode",
+        action="store_true",
+        help="re-encode each file and column with pyarrow instead of only reading the sizes from the footers",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="number of processes that analyze files in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--results-database",
+        default=":memory:",
+        help="SQLite database to keep the results in so only new or changed files are analyzed when it is reused",
+    )
+
+    arguments = parser.parse_args()
+    if arguments.processes < 1:
+        parser.error("--processes must be at least one")
+    return arguments
+
+
 def main():
-    if len(sys.argv) != 3:
-        print(f"python3 {__file__} data_folder time_series_table_name")
-        return
+    arguments = parse_arguments()
 
     # All results are stored in SQLite to simplify aggregating them.
-    results: sqlite3.Connection = sqlite3.connect(":memory:")
+    results: sqlite3.Connection = sqlite3.connect(arguments.results_database)
+    _ = results.execute(
+        """CREATE TABLE IF NOT EXISTS file(file_path TEXT PRIMARY KEY, modified_time_ns INTEGER, fingerprint TEXT, field_column INTEGER, rust_size_in_bytes INTEGER, python_size_in_bytes INTEGER) STRICT"""
+    )
     _ = results.execute(
-        """CREATE TABLE file(field_column INTEGER, rust_size_in_bytes INTEGER, python_size_in_bytes INTEGER) STRICT"""
+        """CREATE TABLE IF NOT EXISTS model_type_use(file_path TEXT, field_column INTEGER, model_type_id INTEGER, segment_count INTEGER) STRICT"""
     )
     _ = results.execute(
-        """CREATE TABLE model_type_use(field_column INTEGER, model_type_id INTEGER, segment_count INTEGER) STRICT"""
+        """CREATE TABLE IF NOT EXISTS file_column(file_path TEXT, field_column INTEGER, column_index INTEGER, column_name TEXT, size_in_bytes INTEGER, uncompressed_size_in_bytes INTEGER) STRICT"""
     )
     _ = results.execute(
-        """CREATE TABLE file_column(field_column INTEGER, column_index INTEGER, column_name TEXT, python_size_in_bytes INTEGER) STRICT"""
+        """CREATE INDEX IF NOT EXISTS model_type_use_file_path ON model_type_use(file_path)"""
+    )
+    _ = results.execute(
+        """CREATE INDEX IF NOT EXISTS file_column_file_path ON file_column(file_path)"""
     )
     results.commit()
 
-    configuration = Configuration(sys.argv[1], sys.argv[2])
-    list_and_process_files(configuration, results)
+    configuration = Configuration(
+        arguments.data_folder, arguments.time_series_table_name
+    )
+    analyzed_files, deleted_files = list_and_process_files(
+        configuration, arguments.reencode, arguments.processes, results
+    )
+    if arguments.results_database != ":memory:":
+        print(f"Analyzed {analyzed_files} new or changed files")
+        print(f"Removed {deleted_files} deleted files")
+        print()
 
     column_indices_column_names = read_column_indices_column_names(
-        sys.argv[1], sys.argv[2]
+        arguments.data_folder, arguments.time_series_table_name
     )
     print_results(column_indices_column_names, results)
 
@@ -1,24 +1,90 @@
 """Script for evaluating multiple different changes to ModelarDB."""
 
+import io
 import os
+import math
 import sys
 import json
 import time
+import queue
+import shutil
+import hashlib
 import atexit
 import signal
+import argparse
 import itertools
+import statistics
+import collections
 import tempfile
+import threading
+import contextlib
 import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+# The server lifecycle manager is shared with the Apache Arrow Flight tester.
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        "Apache-Arrow-Flight-Tester",
+    )
+)
+from lifecycle import ModelarDBServerProcess
 
 # Configuration.
 MODELARDB_REPOSITORY = "https://github.com/ModelarData/ModelarDB-RS.git"
-UTILITIES_REPOSITORY = "https://github.com/ModelarData/Utilities.git"
 TABLE_NAME = "evaluate_changes"
+FLIGHT_PORT = 9999
+BINARY_FOLDER = "target/release"
+BINARIES = ["modelardbd", "modelardb"]
+NANOSECONDS_PER_SECOND = 1_000_000_000
+
+# Two-sided critical values of Student's t-distribution for a 95% confidence
+# interval indexed by the degrees of freedom, 1000 approximates the normal.
+T_CRITICAL_VALUES_95 = {
+    1: 12.706,
+    2: 4.303,
+    3: 3.182,
+    4: 2.776,
+    5: 2.571,
+    6: 2.447,
+    7: 2.365,
+    8: 2.306,
+    9: 2.262,
+    10: 2.228,
+    12: 2.179,
+    15: 2.131,
+    20: 2.086,
+    25: 2.060,
+    30: 2.042,
+    40: 2.021,
+    60: 2.000,
+    120: 1.980,
+    1000: 1.960,
+}
 STDOUT = subprocess.PIPE
 STDERR = subprocess.PIPE
+PARQUET_LOADER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "Apache-Parquet-Loader",
+    "main.py",
+)
 
 
 # Helper Functions.
+def import_parquet_loader():
+    # The loader is a script and not a package, so it is imported by its path.
+    spec = importlib.util.spec_from_file_location("parquet_loader", PARQUET_LOADER_PATH)
+    parquet_loader = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(parquet_loader)
+    return parquet_loader
+
+
+parquet_loader = import_parquet_loader()
+
+
 def read_changes(modelardb_folder, changes_path):
     with open(changes_path) as changes_file:
         changes_file_content = json.load(changes_file)
@@ -52,6 +118,33 @@ def git_reset(path):
     subprocess.run(["git", "-C", path, "reset", "--hard"], stdout=STDOUT, stderr=STDERR)
 
 
+def git_rev_parse_head(path):
+    process = subprocess.run(
+        ["git", "-C", path, "rev-parse", "HEAD"], stdout=STDOUT, stderr=STDERR
+    )
+    return process.stdout.decode("utf-8").strip()
+
+
+def rustc_version():
+    process = subprocess.run(["rustc", "--version"], stdout=STDOUT, stderr=STDERR)
+    return process.stdout.decode("utf-8").strip()
+
+
+def git_worktree_add(repository_path, worktree_path):
+    # A worktree left by a previous run is replaced so it matches the clone.
+    subprocess.run(
+        ["git", "-C", repository_path, "worktree", "remove", "--force", worktree_path],
+        stdout=STDOUT,
+        stderr=STDERR,
+    )
+    subprocess.run(
+        ["git", "-C", repository_path, "worktree", "add", "--detach", worktree_path],
+        stdout=STDOUT,
+        stderr=STDERR,
+        check=True,
+    )
+
+
 def replace_lines(path, start, end, new_lines):
     with open(path, "r") as f:
         lines = f.readlines()
@@ -75,9 +168,17 @@ def replace_lines(path, start, end, new_lines):
 
 
 def cargo_build_release(modelardb_folder):
+    # Each worktree has its own target folder that is reused for each of its
+    # permutations, so only the changed crates are recompiled, and sccache is
+    # used if available so compiled crates are also shared between worktrees.
+    env = dict(os.environ)
+    if "RUSTC_WRAPPER" not in env and shutil.which("sccache"):
+        env["RUSTC_WRAPPER"] = "sccache"
+
     process = subprocess.run(
         ["cargo", "build", "--release"],
         cwd=modelardb_folder,
+        env=env,
         stdout=STDOUT,
         stderr=STDERR,
     )
@@ -85,18 +186,18 @@ def cargo_build_release(modelardb_folder):
     return process.returncode == 0
 
 
-def start_modelardbd(modelardb_folder, data_folder):
-    process = subprocess.Popen(
-        ["target/release/modelardbd", data_folder],
+def start_modelardbd(
+    modelardb_folder, data_folder, port=FLIGHT_PORT, binary_folder=BINARY_FOLDER
+):
+    process = ModelarDBServerProcess(
+        [os.path.join(binary_folder, "modelardbd"), data_folder],
+        f"grpc://127.0.0.1:{port}",
         cwd=modelardb_folder,
-        stdout=STDOUT,
-        stderr=STDERR,
+        env={**os.environ, "MODELARDBD_PORT": str(port)},
     )
 
     # Ensure process is fully started.
-    while not b"Starting Apache Arrow Flight on" in process.stdout.readline():
-        time.sleep(1)
-
+    process.start()
     return process
 
 
@@ -105,40 +206,43 @@ def errors_occurred(output_stream):
     return b"error" in normalized or b"panicked" in normalized
 
 
-def print_stream(output_stream):
-    print()
-    print(output_stream.decode("utf-8"))
+def print_stream(output_stream, file=None):
+    print(file=file)
+    print(output_stream.decode("utf-8"), file=file)
 
 
-def ingest_test_data(utilities_loader, test_data):
-    start_time = time.time()
-    process = subprocess.run(
-        ["python3", utilities_loader, "127.0.0.1:9999", TABLE_NAME, test_data],
-        stdout=STDOUT,
-        stderr=STDERR,
-    )
-
-    if errors_occurred(process.stderr):
-        print_stream(process.stderr)
+def ingest_test_data(test_data, port=FLIGHT_PORT, file=None):
+    # The test data is already in memory, so only the ingestion is measured.
+    start_time = time.perf_counter_ns()
+    try:
+        parquet_loader.ingest(f"127.0.0.1:{port}", TABLE_NAME, test_data)
+    except Exception as error:
+        print(file=file)
+        print(error, file=file)
         return None
     else:
-        return time.time() - start_time
+        return (time.perf_counter_ns() - start_time) / NANOSECONDS_PER_SECOND
+
 
+def execute_queries(
+    modelardb_folder, queries, port=FLIGHT_PORT, binary_folder=BINARY_FOLDER, file=None
+):
+    # The client connects to the default port unless another is given.
+    server = [] if port == FLIGHT_PORT else [f"127.0.0.1:{port}"]
 
-def execute_queries(queries):
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
     process = subprocess.run(
-        ["target/release/modelardb", queries],
+        [os.path.join(binary_folder, "modelardb")] + server + [queries],
         cwd=modelardb_folder,
         stdout=STDOUT,
         stderr=STDERR,
     )
 
     if errors_occurred(process.stderr):
-        print_stream(process.stderr)
+        print_stream(process.stderr, file)
         return None
     else:
-        return time.time() - start_time
+        return (time.perf_counter_ns() - start_time) / NANOSECONDS_PER_SECOND
 
 
 def measure_data_folder_size(data_folder):
@@ -146,38 +250,27 @@ def measure_data_folder_size(data_folder):
     return int(du_output.split(b"\t")[0])
 
 
-def send_sigint_to_process(process):
-    process.send_signal(signal.SIGINT)
-
+def send_sigint_to_process(process, file=None):
     # Ensure process is fully shutdown.
-    while process.poll() is None:
-        time.sleep(1)
+    process.stop()
 
-    process.wait()
-
-    stderr = process.stderr.read()
-    if errors_occurred(stderr):
-        print_stream(stderr)
+    if process.error_occurred.is_set():
+        print_stream(process.stderr().encode("utf-8"), file)
         return None
     else:
         # Indicate no errors occurred.
         return True
 
 
-def append_finished_result(
-    output_file,
-    current_change,
-    changes,
-    ingestion_time,
-    query_execution_times,
-    data_folder_size,
-):
-    results = {
-        "changes": changes,
-        "ingestion_time_in_seconds": ingestion_time,
-        "data_folder_size_in_kib": data_folder_size,
+def append_finished_result(output_file, current_change, changes, measurements):
+    # The mean of each metric is written like a single measurement so the
+    # output is compatible with tools that expect one value per metric.
+    results = {"changes": changes}
+    for metric, samples in measurements.items():
+        results[metric] = statistics.fmean(samples)
+    results["statistics"] = {
+        metric: summarize_samples(samples) for metric, samples in measurements.items()
     }
-    results.update(query_execution_times)
 
     output_file.write('  "')
     output_file.write(str(current_change))
@@ -187,9 +280,388 @@ def append_finished_result(
     output_file.flush()
 
 
-def print_separator(current_change, last_change):
+def summarize_samples(samples):
+    # The confidence interval uses Student's t-distribution as the number of
+    # repetitions is usually small.
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    half_width = t_critical_value(len(samples) - 1) * stdev / math.sqrt(len(samples))
+
+    return {
+        "samples": samples,
+        "mean": mean,
+        "median": statistics.median(samples),
+        "stdev": stdev,
+        "ci_95_low": mean - half_width,
+        "ci_95_high": mean + half_width,
+    }
+
+
+def t_critical_value(degrees_of_freedom):
+    # The value for the closest lower degrees of freedom in the table is used,
+    # which makes the confidence interval slightly wider and thus conservative.
+    if degrees_of_freedom < 1:
+        return 0.0
+
+    degrees_of_freedom = max(
+        df for df in T_CRITICAL_VALUES_95 if df <= degrees_of_freedom
+    )
+    return T_CRITICAL_VALUES_95[degrees_of_freedom]
+
+
+def print_summary(measurements, file=None):
+    for metric, samples in measurements.items():
+        summary = summarize_samples(samples)
+        print(
+            (
+                f"- {metric}: mean {summary['mean']:.6g}, "
+                f"median {summary['median']:.6g}, stdev {summary['stdev']:.6g}, "
+                f"95% CI [{summary['ci_95_low']:.6g}, {summary['ci_95_high']:.6g}]"
+            ),
+            file=file,
+        )
+
+
+def print_not_significantly_different(all_measurements):
+    # Flag the permutations that cannot be distinguished from the best one for
+    # each metric as their 95% confidence intervals overlap.
+    print(100 * "=")
+    print("Permutations not significantly different from the best (95% CI overlap):")
+
+    metrics = sorted(
+        {
+            metric
+            for measurements in all_measurements.values()
+            for metric in measurements
+        }
+    )
+    for metric in metrics:
+        summaries = {
+            current_change: summarize_samples(measurements[metric])
+            for current_change, measurements in all_measurements.items()
+            if metric in measurements
+        }
+
+        # A confidence interval cannot be computed from a single measurement.
+        if any(len(summary["samples"]) < 2 for summary in summaries.values()):
+            print(
+                f"- {metric}: not computed as it requires at least two measurements "
+                "of each permutation, i.e., --repetitions 2 or more"
+            )
+            continue
+
+        best_change = min(summaries, key=lambda change: summaries[change]["mean"])
+        best = summaries[best_change]
+
+        not_significant = [
+            current_change
+            for current_change, summary in sorted(summaries.items())
+            if current_change != best_change
+            and summary["ci_95_low"] <= best["ci_95_high"]
+            and best["ci_95_low"] <= summary["ci_95_high"]
+        ]
+        print(
+            f"- {metric}: best is {best_change} ({best['mean']:.6g}), "
+            f"not significantly different: {', '.join(map(str, not_significant)) or 'none'}"
+        )
+
+
+def print_separator(current_change, last_change, file=None):
     if current_change != last_change:
-        print(100 * "=")
+        print(100 * "=", file=file)
+
+
+class BuildAndBenchmarkScheduler:
+    """Ensures that builds and benchmarks never run at the same time so compiles do not disturb the timings."""
+
+    def __init__(self, build_slots, benchmark_slots):
+        self.build_slots = build_slots
+        self.benchmark_slots = benchmark_slots
+        self.running_builds = 0
+        self.running_benchmarks = 0
+        self.waiting_benchmarks = 0
+        self.condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def build(self):
+        # Waiting benchmarks are prioritized so builds cannot starve them.
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.running_benchmarks == 0
+                and self.waiting_benchmarks == 0
+                and self.running_builds < self.build_slots
+            )
+            self.running_builds += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running_builds -= 1
+                self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def benchmark(self):
+        with self.condition:
+            self.waiting_benchmarks += 1
+            self.condition.wait_for(
+                lambda: self.running_builds == 0
+                and self.running_benchmarks < self.benchmark_slots
+            )
+            self.waiting_benchmarks -= 1
+            self.running_benchmarks += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running_benchmarks -= 1
+                self.condition.notify_all()
+
+
+class BinaryCache:
+    """Content-addressed cache of the binaries built for each change with size-based LRU eviction."""
+
+    def __init__(self, folder, max_size_in_bytes, source_version):
+        self.folder = folder
+        self.max_size_in_bytes = max_size_in_bytes
+        self.source_version = source_version
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def key(self, relative_file_path, start, end, changes):
+        # The binaries only depend on the commit, the compiler, and the change.
+        content = [self.source_version, relative_file_path, start, end, list(changes)]
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        # The modification time of an entry is updated when it is used, so the
+        # least recently used entries can be evicted first.
+        entry_folder = os.path.abspath(os.path.join(self.folder, key))
+        with self.lock:
+            if not os.path.isdir(entry_folder):
+                return None
+
+            os.utime(entry_folder)
+            return entry_folder
+
+    def store(self, key, binary_folder):
+        # The entry is copied to a temporary folder and then renamed, so an
+        # interrupted copy is never used.
+        entry_folder = os.path.join(self.folder, key)
+        temporary_entry_folder = tempfile.mkdtemp(dir=self.folder, prefix=".")
+        for binary in BINARIES:
+            shutil.copy2(
+                os.path.join(binary_folder, binary),
+                os.path.join(temporary_entry_folder, binary),
+            )
+
+        with self.lock:
+            if os.path.isdir(entry_folder):
+                shutil.rmtree(temporary_entry_folder)
+            else:
+                os.rename(temporary_entry_folder, entry_folder)
+            os.utime(entry_folder)
+            self.evict(keep=entry_folder)
+
+    def evict(self, keep):
+        # Remove the least recently used entries until the cache fits.
+        entries = []
+        for name in os.listdir(self.folder):
+            entry_folder = os.path.join(self.folder, name)
+            if name.startswith(".") or not os.path.isdir(entry_folder):
+                continue
+
+            size_in_bytes = sum(
+                os.path.getsize(os.path.join(entry_folder, binary))
+                for binary in os.listdir(entry_folder)
+            )
+            entries.append(
+                (os.path.getmtime(entry_folder), entry_folder, size_in_bytes)
+            )
+
+        total_size_in_bytes = sum(size_in_bytes for _, _, size_in_bytes in entries)
+        for _, entry_folder, size_in_bytes in sorted(entries):
+            if total_size_in_bytes <= self.max_size_in_bytes:
+                break
+
+            if entry_folder != keep:
+                shutil.rmtree(entry_folder)
+                total_size_in_bytes -= size_in_bytes
+
+
+def evaluate_permutation(
+    worker_folder,
+    port,
+    scheduler,
+    relative_file_path,
+    start,
+    end,
+    changes,
+    test_data,
+    query_sets,
+    warmup=0,
+    repetitions=1,
+    binary_cache=None,
+    file=None,
+    stop=None,
+):
+    # Return the measurements of each metric for changes or None if it failed
+    # or stop is set before a build or benchmark run is started.
+    cache_key = binary_cache and binary_cache.key(
+        relative_file_path, start, end, changes
+    )
+    binary_folder = binary_cache and binary_cache.lookup(cache_key)
+
+    if binary_folder:
+        print("Using cached binaries.", file=file)
+    else:
+        with scheduler.build():
+            if stop and stop.is_set():
+                return None
+
+            git_reset(worker_folder)
+            replace_lines(worker_folder + relative_file_path, start, end, changes)
+            if not cargo_build_release(worker_folder):
+                print("ERROR: failed to compile ModelarDB.", file=file)
+                return None
+
+        binary_folder = os.path.abspath(os.path.join(worker_folder, BINARY_FOLDER))
+        if binary_cache:
+            binary_cache.store(cache_key, binary_folder)
+
+    # Warmup runs are not measured and each run uses a new data folder.
+    measurements = collections.defaultdict(list)
+    with scheduler.benchmark():
+        for run in range(warmup + repetitions):
+            if stop and stop.is_set():
+                return None
+
+            results = run_benchmark(
+                worker_folder, port, binary_folder, test_data, query_sets, file
+            )
+            if not results:
+                return None
+
+            if run >= warmup:
+                ingestion_time, query_execution_times, data_folder_size = results
+                measurements["ingestion_time_in_seconds"].append(ingestion_time)
+                for query_execution_name, query_time in query_execution_times.items():
+                    measurements[query_execution_name].append(query_time)
+                measurements["data_folder_size_in_kib"].append(data_folder_size)
+
+    return measurements
+
+
+def run_benchmark(worker_folder, port, binary_folder, test_data, query_sets, file=None):
+    # Prepare data folder.
+    temporary_directory = tempfile.TemporaryDirectory()
+    data_folder = temporary_directory.name
+
+    # Measure ingestion time in seconds.
+    modelardbd = start_modelardbd(worker_folder, data_folder, port, binary_folder)
+    ingestion_time = ingest_test_data(test_data, port, file)
+    if not ingestion_time:
+        print("ERROR: failed to ingest test data.", file=file)
+        modelardbd.kill()
+        return None
+
+    # Measure query time in seconds.
+    query_execution_times = {}
+    for query_set in query_sets:
+        query_time = execute_queries(
+            worker_folder, query_set, port, binary_folder, file
+        )
+        if not query_time:
+            print(f"ERROR: failed to execute queries in {query_set}.", file=file)
+            continue
+
+        query_set_name = os.path.basename(query_set)
+        query_execution_name = f"{query_set_name}_in_seconds"
+        query_execution_times[query_execution_name] = query_time
+
+    # Ensure the process is gone.
+    successfully_killed = send_sigint_to_process(modelardbd, file)
+    if not successfully_killed:
+        print("ERROR: failed to terminate process.", file=file)
+        return None
+
+    # Measure size of data folder in kilobytes.
+    data_folder_size = measure_data_folder_size(data_folder)
+    temporary_directory.cleanup()
+
+    return ingestion_time, query_execution_times, data_folder_size
+
+
+def create_worker_folders(modelardb_folder, workers):
+    # The first worker uses the clone and the others use their own worktree,
+    # so each worker has its own source files and target folder.
+    worker_folders = [modelardb_folder]
+    for worker in range(1, workers):
+        worker_folder = f"{modelardb_folder.rstrip('/')}-Worker-{worker}/"
+        git_worktree_add(modelardb_folder, os.path.abspath(worker_folder))
+        worker_folders.append(worker_folder)
+
+    return worker_folders
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Evaluate multiple different changes to ModelarDB."
+    )
+    parser.add_argument("output_file")
+    parser.add_argument("changes")
+    parser.add_argument("parquet_file_or_folder")
+    parser.add_argument("query_sets", nargs="+")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of permutations evaluated in parallel, each in its own worktree",
+    )
+    parser.add_argument(
+        "--build-slots",
+        type=int,
+        help="number of builds that run in parallel (default: workers)",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=0,
+        help="number of runs of each permutation before measuring",
+    )
+    parser.add_argument(
+        "--repetitions",
+        type=int,
+        default=1,
+        help="number of measured runs of each permutation",
+    )
+    parser.add_argument(
+        "--cache-folder",
+        help="folder to cache the binaries built for each permutation in",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=10.0,
+        help="maximum size of the cache in GiB before the least recently used "
+        "binaries are removed",
+    )
+    parser.add_argument(
+        "--benchmark-slots",
+        type=int,
+        default=1,
+        help="number of benchmarks that run in parallel, never during builds",
+    )
+
+    arguments = parser.parse_args()
+    if arguments.workers < 1 or arguments.benchmark_slots < 1:
+        parser.error("--workers and --benchmark-slots must be at least one")
+
+    if arguments.warmup < 0 or arguments.repetitions < 1:
+        parser.error("--warmup cannot be negative and --repetitions must be positive")
+
+    return arguments
 
 
 def finish_output_file_and_kill_process(output_file):
@@ -199,37 +671,36 @@ def finish_output_file_and_kill_process(output_file):
         output_file.write("\n}\n")
         output_file.close()
 
-    # Kill leftover processes.
+    kill_child_processes()
+
+
+def kill_child_processes():
+    # Kill leftover processes, i.e., the builds, servers, and clients started by
+    # the workers and the compilers started by cargo.
+    subprocess.run(
+        ["pkill", "-9", "-P", str(os.getpid())], stdout=STDOUT, stderr=STDERR
+    )
     subprocess.run(["pkill", "-9", "cargo"], stdout=STDOUT, stderr=STDERR)
     subprocess.run(["pkill", "-9", "rustc"], stdout=STDOUT, stderr=STDERR)
 
 
 # Main Function.
 if __name__ == "__main__":
-    # Ensure the necessary arguments are provided.
-    if len(sys.argv) < 5:
-        print(
-            "usage: "
-            + sys.argv[0]
-            + " output_file changes.json parquet_file_or_folder queries.sql+"
-        )
-        sys.exit(1)
+    arguments = parse_arguments()
 
     # The script assumes it runs on Linux.
     if sys.platform != "linux":
         print("ERROR: " + sys.argv[0] + " only supports Linux")
         sys.exit(1)
 
-    # Clone repositories.
+    # Clone repository.
     modelardb_folder = extract_repository_name(MODELARDB_REPOSITORY)
     git_clone(MODELARDB_REPOSITORY)
 
-    utilities_folder = extract_repository_name(UTILITIES_REPOSITORY)
-    utilities_loader = utilities_folder + "Apache-Parquet-Loader/main.py"
-    git_clone(UTILITIES_REPOSITORY)
-
     # Read changes.
-    (file_path, start, end, changes) = read_changes(modelardb_folder, sys.argv[2])
+    (file_path, start, end, changes) = read_changes(
+        modelardb_folder, arguments.changes
+    )
     if not os.path.isfile(file_path):
         print("ERROR: the file to change does not exist.")
         sys.exit(1)
@@ -238,13 +709,40 @@ if __name__ == "__main__":
         print("ERROR: the value of start or end is not positive.")
         sys.exit(1)
 
+    # Read the test data once so it is not read again for each permutation.
+    test_data = parquet_loader.read_parquet_file_or_folder(
+        arguments.parquet_file_or_folder
+    )
+
     # Compute absolute paths.
-    test_data = os.path.abspath(sys.argv[3])
-    query_sets = list(map(lambda q: os.path.abspath(q), sys.argv[4:]))
+    query_sets = list(map(lambda q: os.path.abspath(q), arguments.query_sets))
+
+    # Prepare a folder and a port for each worker.
+    relative_file_path = file_path[len(modelardb_folder) :]
+    workers = queue.Queue()
+    for worker, worker_folder in enumerate(
+        create_worker_folders(modelardb_folder, arguments.workers)
+    ):
+        workers.put((worker_folder, FLIGHT_PORT + worker))
+
+    # The binaries are cached for the commit that is evaluated.
+    if arguments.cache_folder:
+        binary_cache = BinaryCache(
+            arguments.cache_folder,
+            arguments.cache_size * 1024 * 1024 * 1024,
+            [git_rev_parse_head(modelardb_folder), rustc_version()],
+        )
+    else:
+        binary_cache = None
+
+    scheduler = BuildAndBenchmarkScheduler(
+        arguments.build_slots or arguments.workers, arguments.benchmark_slots
+    )
 
     # Open output file.
-    output_file = open(sys.argv[1], "w")
+    output_file = open(arguments.output_file, "w")
     output_file.write("{\n")
+    output_lock = threading.Lock()
 
     # Cleanup on exit.
     atexit.register(finish_output_file_and_kill_process, output_file)
@@ -253,64 +751,76 @@ if __name__ == "__main__":
 
     # Evaluate changes.
     last_change = len(changes)
-    for index, changes in enumerate(changes):
-        # Print what changes are being evaluated.
-        current_change = index + 1
-        print("Evaluating Permutation {} of {}".format(current_change, last_change))
-        print(file_path, start, end)
-        print("\n".join(changes))
-
-        # Prepare data folder.
-        temporary_directory = tempfile.TemporaryDirectory()
-        data_folder = temporary_directory.name
-
-        # Prepare and run new executable.
-        git_reset(modelardb_folder)
-        replace_lines(file_path, start, end, changes)
-        if not cargo_build_release(modelardb_folder):
-            print("ERROR: failed to compile ModelarDB.")
-            print_separator(current_change, last_change)
-            continue
-
-        # Measure ingestion time in seconds.
-        modelardbd = start_modelardbd(modelardb_folder, data_folder)
-        ingestion_time = ingest_test_data(utilities_loader, test_data)
-        if not ingestion_time:
-            print("ERROR: failed to ingest test data.")
-            print_separator(current_change, last_change)
-            continue
+    all_measurements = {}
+    stop_evaluating = threading.Event()
 
-        # Measure query time in seconds.
-        query_execution_times = {}
-        for query_set in query_sets:
-            query_time = execute_queries(query_set)
-            if not query_time:
-                print(f"ERROR: failed to execute queries in {query_set}.")
-                print_separator(current_change, last_change)
-                continue
-
-            query_set_name = os.path.basename(query_set)
-            query_execution_name = f"{query_set_name}_in_seconds"
-            query_execution_times[query_execution_name] = query_time
+    def evaluate(index, changes):
+        # The output is buffered when evaluating in parallel, so the output of
+        # each permutation is printed together when the permutation is done.
+        current_change = index + 1
+        if stop_evaluating.is_set():
+            return
 
-        # Ensure the process is gone.
-        successfully_killed = send_sigint_to_process(modelardbd)
-        if not successfully_killed:
-            print("ERROR: failed to terminate process.")
-            print_separator(current_change, last_change)
-            continue
+        file = io.StringIO() if arguments.workers > 1 else None
 
-        # Measure size of data folder in kilobytes.
-        data_folder_size = measure_data_folder_size(data_folder)
-        append_finished_result(
-            output_file,
-            current_change,
-            changes,
-            ingestion_time,
-            query_execution_times,
-            data_folder_size,
+        # Print what changes are being evaluated.
+        print(
+            "Evaluating Permutation {} of {}".format(current_change, last_change),
+            file=file,
         )
-        temporary_directory.cleanup()
-
-        # Print a separator between each evaluation.
-        print_separator(current_change, last_change)
+        print(file_path, start, end, file=file)
+        print("\n".join(changes), file=file)
+
+        worker_folder, port = workers.get()
+        try:
+            measurements = evaluate_permutation(
+                worker_folder,
+                port,
+                scheduler,
+                relative_file_path,
+                start,
+                end,
+                changes,
+                test_data,
+                query_sets,
+                arguments.warmup,
+                arguments.repetitions,
+                binary_cache,
+                file,
+                stop_evaluating,
+            )
+        finally:
+            workers.put((worker_folder, port))
+
+        with output_lock:
+            if measurements:
+                print_summary(measurements, file)
+                append_finished_result(
+                    output_file, current_change, changes, measurements
+                )
+                all_measurements[current_change] = measurements
+
+            # Print a separator between each evaluation.
+            print_separator(current_change, last_change, file)
+            if file:
+                print(file.getvalue(), end="")
+
+    with ThreadPoolExecutor(arguments.workers) as executor:
+        futures = [
+            executor.submit(evaluate, index, changes)
+            for index, changes in enumerate(changes)
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # The signal handlers raise SystemExit while waiting, so the queued
+            # permutations are cancelled and the running permutations are
+            # stopped by killing their processes instead of waiting for them.
+            stop_evaluating.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            kill_child_processes()
+            raise
+
+    if all_measurements:
+        print_not_significantly_different(all_measurements)
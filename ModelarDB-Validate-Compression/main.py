@@ -1,26 +1,62 @@
 """Script for validating ModelarDB's compression with different data sets."""
 
+import io
+import os
 import sys
-import math
-import time
-import signal
+import glob
 import tempfile
 import subprocess
+import argparse
+import functools
+import multiprocessing
 import collections
+import importlib.util
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import numpy
+import pyarrow
 from pyarrow import parquet
 from pyarrow import flight
 
+# The server lifecycle manager is shared with the Apache Arrow Flight tester.
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        "Apache-Arrow-Flight-Tester",
+    )
+)
+from lifecycle import ModelarDBServerProcess
+
 # Configuration.
 MODELARDB_REPOSITORY = "https://github.com/ModelarData/ModelarDB-RS.git"
-UTILITIES_REPOSITORY = "https://github.com/ModelarData/Utilities.git"
 TABLE_NAME = "evaluate"
+FLIGHT_PORT = 9999
+MEMORY_PER_SERVER_IN_GIB = 4.0
 STDOUT = subprocess.PIPE
 STDERR = subprocess.PIPE
+METRICS_CHUNK_SIZE = 1048576
+PARQUET_LOADER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "Apache-Parquet-Loader",
+    "main.py",
+)
 
 
 # Helper Functions.
+def import_parquet_loader():
+    # The loader is a script and not a package, so it is imported by its path.
+    spec = importlib.util.spec_from_file_location("parquet_loader", PARQUET_LOADER_PATH)
+    parquet_loader = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(parquet_loader)
+    return parquet_loader
+
+
+parquet_loader = import_parquet_loader()
+
+
 def extract_repository_name(url):
     # The plus operator is used instead of an fstring as it was more readable.
     return url[url.rfind("/") + 1 : url.rfind(".")] + "/"
@@ -41,49 +77,29 @@ def cargo_build_release(modelardb_folder):
     return process.returncode == 0
 
 
-def start_modelardbd(modelardb_folder, data_folder):
-    process = subprocess.Popen(
+def start_modelardbd(modelardb_folder, data_folder, port=FLIGHT_PORT):
+    process = ModelarDBServerProcess(
         ["target/release/modelardbd", data_folder],
+        f"grpc://127.0.0.1:{port}",
         cwd=modelardb_folder,
-        stdout=STDOUT,
-        stderr=STDERR,
+        env={**os.environ, "MODELARDBD_PORT": str(port)},
     )
 
     # Ensure process is fully started.
-    while not b"Starting Apache Arrow Flight on" in process.stdout.readline():
-        time.sleep(1)
-
+    process.start()
     return process
 
 
-def errors_occurred(output_stream):
-    normalized = output_stream.lower()
-    return b"error" in normalized or b"panicked" in normalized
-
+def print_stream(output_stream, file=None):
+    print(file=file)
+    print(output_stream, file=file)
 
-def print_stream(output_stream):
-    print()
-    print(output_stream.decode("utf-8"))
 
-
-def ingest_test_data(utilities_loader, test_data, error_bound_str):
-    process = subprocess.run(
-        [
-            "python3",
-            utilities_loader,
-            "127.0.0.1:9999",
-            TABLE_NAME,
-            test_data,
-            error_bound_str,
-        ],
-        stdout=STDOUT,
-        stderr=STDERR,
+def ingest_test_data(test_data, error_bound_str, port=FLIGHT_PORT):
+    return parquet_loader.ingest(
+        f"127.0.0.1:{port}", TABLE_NAME, test_data, error_bound_str
     )
 
-    if errors_occurred(process.stderr):
-        print_stream(process.stderr)
-        return True
-
 
 def retrieve_schema(flight_client):
     flight_descriptor = flight.FlightDescriptor.for_path(TABLE_NAME)
@@ -91,15 +107,231 @@ def retrieve_schema(flight_client):
     return schema_result.schema
 
 
-def retrieve_ingested_columns(flight_client, timestamp_column_name, field_column_name):
+def retrieve_ingested_batches(flight_client, column_names):
+    # The first column is the timestamps and the rest are field columns.
     ticket = flight.Ticket(
         (
-            f"SELECT {timestamp_column_name}, {field_column_name} "
-            f"FROM {TABLE_NAME} ORDER BY {timestamp_column_name}"
+            f"SELECT {', '.join(column_names)} "
+            f"FROM {TABLE_NAME} ORDER BY {column_names[0]}"
         )
     )
     reader = flight_client.do_get(ticket)
-    return reader.read_all()
+
+    # The batches are yielded as they are received so the columns are never
+    # fully materialized in memory.
+    for chunk in reader:
+        yield chunk.data
+
+
+def list_parquet_files(parquet_file_or_folder):
+    # The files are sorted as the Apache Parquet loader ingests them in order.
+    if os.path.isdir(parquet_file_or_folder):
+        return sorted(glob.glob(parquet_file_or_folder + os.sep + "*.parquet"))
+    return [parquet_file_or_folder]
+
+
+def read_test_data_batches(parquet_files, column_names):
+    for parquet_file in parquet_files:
+        yield from parquet.ParquetFile(parquet_file).iter_batches(
+            batch_size=METRICS_CHUNK_SIZE, columns=column_names
+        )
+
+
+def find_test_data_column_name(test_data_column_names, column_name):
+    if column_name in test_data_column_names:
+        return column_name
+
+    # Spaces in the name may have been replaced by underscores
+    # and upper case columns may have been converted to lower case.
+    column_name_lowercase_with_space = column_name.replace("_", " ").lower()
+    for test_data_column_name in test_data_column_names:
+        if test_data_column_name.lower() == column_name_lowercase_with_space:
+            return test_data_column_name
+
+    raise ValueError(f"{column_name} is not in the test data.")
+
+
+class MetricsAccumulator:
+    """Metrics for a field column that are updated one chunk of data points at a time."""
+
+    def __init__(self, error_bound):
+        self.error_bound = error_bound
+        self.total_values = 0
+        self.equal_values = 0
+
+        self.sum_absolute_difference = 0.0
+        self.sum_absolute_test_data_values = 0.0
+        self.sum_actual_error_ratio_for_mape = 0.0
+
+        self.max_actual_error = 0.0
+        self.max_actual_error_test_data_value = 0.0
+        self.max_actual_error_decompressed_value = 0.0
+
+        # A Counter for the actual error of each decompressed value rounded
+        # up to the nearest integer so a simple histogram can be printed.
+        self.ceiled_actual_error_counter = collections.Counter()
+
+        # The data points with a value that exceeds the error bound.
+        self.data_points_above_error_bound = []
+
+        # The data points with a value that has an undefined error.
+        self.data_points_with_undefined_error = []
+
+    def update(self, timestamps, test_data_values, decompressed_values):
+        self.total_values += len(timestamps)
+
+        # Division by zero and NaNs produce inf and NaN errors as intended.
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            equal = (test_data_values == decompressed_values) | (
+                numpy.isnan(test_data_values) & numpy.isnan(decompressed_values)
+            )
+            difference = numpy.where(
+                equal, numpy.float32(0.0), test_data_values - decompressed_values
+            )
+            actual_error_ratio = numpy.where(
+                equal, numpy.float32(0.0), numpy.abs(difference / test_data_values)
+            )
+            actual_error = 100.0 * actual_error_ratio
+
+        # The sums are computed with float64 to not lose precision for large
+        # columns. NaNs propagate to the sums like in the scalar computation.
+        self.equal_values += int(numpy.count_nonzero(equal))
+        self.sum_absolute_difference += numpy.sum(
+            numpy.abs(difference), dtype=numpy.float64
+        )
+        self.sum_absolute_test_data_values += numpy.sum(
+            numpy.abs(test_data_values), dtype=numpy.float64
+        )
+        self.sum_actual_error_ratio_for_mape += numpy.sum(
+            actual_error_ratio, dtype=numpy.float64
+        )
+
+        # NaN errors are never the maximum and the first maximum is kept.
+        comparable_actual_error = numpy.where(
+            numpy.isnan(actual_error), -numpy.inf, actual_error
+        )
+        if len(comparable_actual_error) > 0:
+            index = numpy.argmax(comparable_actual_error)
+            if self.max_actual_error < comparable_actual_error[index]:
+                self.max_actual_error = actual_error[index]
+                self.max_actual_error_test_data_value = test_data_values[index]
+                self.max_actual_error_decompressed_value = decompressed_values[index]
+
+        # The actual error cannot be rounded up if it is -inf, inf, or NaN.
+        defined = numpy.isfinite(actual_error)
+        ceiled_actual_errors, counts = numpy.unique(
+            numpy.ceil(actual_error[defined]).astype(numpy.int64), return_counts=True
+        )
+        for ceiled_actual_error, count in zip(ceiled_actual_errors, counts):
+            self.ceiled_actual_error_counter[int(ceiled_actual_error)] += int(count)
+
+        undefined = ~defined
+        if undefined.any():
+            self.ceiled_actual_error_counter["UNDEFINED"] += int(undefined.sum())
+            self.data_points_with_undefined_error.extend(
+                zip(
+                    timestamps[undefined],
+                    test_data_values[undefined],
+                    decompressed_values[undefined],
+                )
+            )
+
+        above_error_bound = actual_error > self.error_bound
+        if above_error_bound.any():
+            self.data_points_above_error_bound.extend(
+                zip(
+                    timestamps[above_error_bound],
+                    test_data_values[above_error_bound],
+                    decompressed_values[above_error_bound],
+                )
+            )
+
+    def merge(self, other):
+        # other must contain the data points that follow those in self, so the
+        # result is the same as if self had been updated with them directly.
+        self.total_values += other.total_values
+        self.equal_values += other.equal_values
+
+        self.sum_absolute_difference += other.sum_absolute_difference
+        self.sum_absolute_test_data_values += other.sum_absolute_test_data_values
+        self.sum_actual_error_ratio_for_mape += other.sum_actual_error_ratio_for_mape
+
+        if self.max_actual_error < other.max_actual_error:
+            self.max_actual_error = other.max_actual_error
+            self.max_actual_error_test_data_value = (
+                other.max_actual_error_test_data_value
+            )
+            self.max_actual_error_decompressed_value = (
+                other.max_actual_error_decompressed_value
+            )
+
+        self.ceiled_actual_error_counter.update(other.ceiled_actual_error_counter)
+        self.data_points_above_error_bound.extend(other.data_points_above_error_bound)
+        self.data_points_with_undefined_error.extend(
+            other.data_points_with_undefined_error
+        )
+
+    def print_metrics(self, file=None):
+        print(f"- Total Number of Values: {self.total_values}", file=file)
+        print(
+            f"- Without Error: {100 * (self.equal_values / self.total_values)}%",
+            file=file,
+        )
+        print(
+            (
+                "- Average Relative Error: "
+                f"{100 * (self.sum_absolute_difference / self.sum_absolute_test_data_values)}%"
+            ),
+            file=file,
+        )
+        print(
+            (
+                "- Mean Absolute Percentage Error: "
+                f"{100.0 * (self.sum_actual_error_ratio_for_mape / self.total_values)}%"
+            ),
+            file=file,
+        )
+        print(
+            (
+                f"- Maximum Error: {self.max_actual_error}% due to "
+                f"{self.max_actual_error_test_data_value} (test data) and "
+                f"{self.max_actual_error_decompressed_value} (decompressed)"
+            ),
+            file=file,
+        )
+
+        # The histogram goes up to the largest error that could be rounded up.
+        highest_ceiled_error = max(
+            (key for key in self.ceiled_actual_error_counter if key != "UNDEFINED"),
+            default=0,
+        )
+        print("- Error Ceil Histogram:", end="", file=file)
+        for ceiled_error in range(0, highest_ceiled_error + 1):
+            print(
+                f" {ceiled_error}% {self.ceiled_actual_error_counter[ceiled_error]} ",
+                end="",
+                file=file,
+            )
+
+        if self.ceiled_actual_error_counter["UNDEFINED"] != 0:
+            print(
+                f" Undefined {self.ceiled_actual_error_counter['UNDEFINED']}", file=file
+            )
+        else:
+            print(file=file)
+
+        print_data_points_if_any(
+            "- Exceeded Error Bound (Timestamp, Test Data Value, Decompressed Value):",
+            self.data_points_above_error_bound,
+            file,
+        )
+
+        print_data_points_if_any(
+            "- Undefined Actual Error (Timestamp, Test Data Value, Decompressed Value):",
+            self.data_points_with_undefined_error,
+            file,
+        )
+        print(file=file)
 
 
 def compute_and_print_metrics(
@@ -108,162 +340,252 @@ def compute_and_print_metrics(
     decompressed_columns,
     error_bound,
 ):
-    # Arrays make iteration simpler and float32 match ModelarDB's precision.
-    test_data_timestamp_column = test_data_timestamp_column.to_numpy()
-    test_data_field_column = test_data_field_column.to_numpy().astype(numpy.float32)
-    decompressed_timestamp_column = decompressed_columns[0].to_numpy()
-    decompressed_field_column = decompressed_columns[1].to_numpy()
+    test_data = pyarrow.table(
+        [test_data_timestamp_column, test_data_field_column], ["timestamp", "field"]
+    )
+    decompressed = pyarrow.table(
+        [decompressed_columns[0], decompressed_columns[1]], ["timestamp", "field"]
+    )
+    compute_and_print_streaming_metrics(
+        test_data.to_batches(), decompressed.to_batches(), error_bound
+    )
 
-    # Initialize variables for computing metrics.
-    equal_values = 0
 
-    sum_absolute_difference = 0.0
-    sum_absolute_test_data_values = 0.0
-    sum_actual_error_ratio_for_mape = 0.0
+def compute_and_print_streaming_metrics(
+    test_data_batches, decompressed_batches, error_bound
+):
+    metrics, error = compute_streaming_metrics(
+        test_data_batches, decompressed_batches, error_bound, 1
+    )
+    print_metrics_or_error(metrics[0], error)
 
-    max_actual_error = 0.0
-    max_actual_error_test_data_value = 0.0
-    max_actual_error_decompressed_value = 0.0
 
-    # Initialize a Counter for the actual error of each decompressed value
-    # rounded to the nearest integer so a simple histogram can be printed.
-    ceiled_actual_error_counter = collections.Counter()
+def compute_metrics_for_columns(
+    location, parquet_files, column_names, error_bound, executor=None, workers=1
+):
+    # column_names maps the name of each column in ModelarDB to its name in the
+    # test data with the timestamp column first. A new FlightClient is created
+    # as this function is also executed by worker processes. If executor is
+    # given, the metrics are computed by its workers, see compute_streaming_metrics.
+    flight_client = flight.FlightClient(location)
+    try:
+        test_data_batches = read_test_data_batches(
+            parquet_files, list(column_names.values())
+        )
+        decompressed_batches = retrieve_ingested_batches(
+            flight_client, list(column_names.keys())
+        )
+        return compute_streaming_metrics(
+            test_data_batches,
+            decompressed_batches,
+            error_bound,
+            len(column_names) - 1,
+            executor,
+            workers,
+        )
+    finally:
+        flight_client.close()
 
-    # Indices of the data points with a value that exceeds the error bound.
-    indices_of_values_above_error_bound = []
 
-    # Indices of the data points with a value that has an undefined error.
-    indices_of_values_with_undefined_error = []
+def compute_metrics_for_field_columns(
+    location, parquet_files, column_names, error_bound, single_query, workers
+):
+    # Yield the name, the metrics, and the error, if any, for each field column
+    # in the same order as column_names. Either all of the field columns are
+    # retrieved by one query and the metrics for each chunk of each field column
+    # are computed by a pool of worker processes, or each field column is
+    # retrieved by its own query that is executed by a worker process that also
+    # computes the metrics for it.
+    (timestamp_column_name, test_data_timestamp_column_name), *field_column_names = (
+        column_names.items()
+    )
 
-    # The length of each pair of timestamp and value columns should always be
-    # equal as this is required by both Apache Parquet files and Apache Arrow
-    # RecordBatches, however, it is checked just to be absolutely sure it is.
-    if len(test_data_timestamp_column) != len(decompressed_timestamp_column) or len(
-        test_data_field_column
-    ) != len(decompressed_field_column):
-        print(
-            (
-                "ERROR: the length of the columns in the test data "
-                f"({len(test_data_timestamp_column)}) and length the decompressed "
-                f"columns ({len(decompressed_timestamp_column)}) are not equal."
+    column_names_for_each_field_column = [
+        {
+            timestamp_column_name: test_data_timestamp_column_name,
+            field_column_name: test_data_field_column_name,
+        }
+        for field_column_name, test_data_field_column_name in field_column_names
+    ]
+
+    # The workers are spawned as forking a process with gRPC threads is unsafe.
+    spawn = multiprocessing.get_context("spawn")
+    with (
+        ProcessPoolExecutor(workers, mp_context=spawn) if workers > 1 else nullcontext()
+    ) as executor:
+        if single_query:
+            metrics, error = compute_metrics_for_columns(
+                location, parquet_files, column_names, error_bound, executor, workers
             )
+            for (field_column_name, _), field_metrics in zip(
+                field_column_names, metrics
+            ):
+                yield field_column_name, field_metrics, error
+            return
+
+        compute_metrics = functools.partial(
+            compute_metrics_for_columns,
+            location,
+            parquet_files,
+            error_bound=error_bound,
+        )
+        results = (executor.map if executor else map)(
+            compute_metrics, column_names_for_each_field_column
         )
-        return
 
-    # Compute metrics.
-    for index in range(0, len(test_data_timestamp_column)):
-        test_data_timestamp = test_data_timestamp_column[index]
-        test_data_value = test_data_field_column[index]
-        decompressed_timestamp = decompressed_timestamp_column[index]
-        decompressed_value = decompressed_field_column[index]
+        for (field_column_name, _), (metrics, error) in zip(
+            field_column_names, results
+        ):
+            yield field_column_name, metrics[0], error
 
-        if test_data_timestamp != decompressed_timestamp:
-            print(
-                (
-                    f"ERROR: at index {index}, the timestamp in the test data "
-                    f"({test_data_timestamp}) and the decompressed timestamp "
-                    f"({decompressed_timestamp}) are not equal."
-                )
+
+def print_metrics_or_error(metrics, error, file=None):
+    if error:
+        print(error, file=file)
+    else:
+        metrics.print_metrics(file)
+
+
+def compute_chunk_metrics(
+    error_bound, timestamps, test_data_values, decompressed_values
+):
+    metrics = MetricsAccumulator(error_bound)
+    metrics.update(timestamps, test_data_values, decompressed_values)
+    return metrics
+
+
+def compute_streaming_metrics(
+    test_data_batches,
+    decompressed_batches,
+    error_bound,
+    number_of_field_columns,
+    executor=None,
+    workers=1,
+):
+    # The test data and the decompressed data are merged one pair of equal
+    # length chunks at a time, so only the current batches are in memory. The
+    # first column in the batches is the timestamps and the rest are fields.
+    # A MetricsAccumulator is returned for each field column together with
+    # an error message if the test data and the decompressed data differ. If
+    # executor is given, the metrics for each field column in each chunk are
+    # computed by its workers and merged in order, with at most workers chunks
+    # in progress so the memory used remains bounded.
+    test_data_chunks = iterate_numpy_chunks(test_data_batches)
+    decompressed_chunks = iterate_numpy_chunks(decompressed_batches)
+
+    metrics = [MetricsAccumulator(error_bound) for _ in range(number_of_field_columns)]
+    test_data_timestamps = decompressed_timestamps = numpy.empty(0)
+    test_data_values = decompressed_values = []
+    compared_values = 0
+    pending_chunk_metrics = collections.deque()
+
+    def merge_pending_chunk_metrics(max_pending):
+        while len(pending_chunk_metrics) > max_pending * number_of_field_columns:
+            field_metrics, chunk_metrics = pending_chunk_metrics.popleft()
+            field_metrics.merge(chunk_metrics.result())
+
+    while True:
+        if len(test_data_timestamps) == 0:
+            test_data_timestamps, test_data_values = next(
+                test_data_chunks, (None, None)
             )
-            return
+        if len(decompressed_timestamps) == 0:
+            decompressed_timestamps, decompressed_values = next(
+                decompressed_chunks, (None, None)
+            )
+        if test_data_timestamps is None or decompressed_timestamps is None:
+            break
 
-        if test_data_value == decompressed_value or (
-            math.isnan(test_data_value) and math.isnan(decompressed_value)
-        ):
-            equal_values += 1
-            difference = 0.0
-            actual_error_ratio = 0.0
-        else:
-            difference = test_data_value - decompressed_value
-            actual_error_ratio = abs(difference / test_data_value)
-
-        actual_error = 100.0 * actual_error_ratio
-
-        sum_absolute_difference += abs(difference)
-        sum_absolute_test_data_values += abs(test_data_value)
-        sum_actual_error_ratio_for_mape += actual_error_ratio
-
-        if max_actual_error < actual_error:
-            max_actual_error = actual_error
-            max_actual_error_test_data_value = test_data_value
-            max_actual_error_decompressed_value = decompressed_value
-
-        # math.ceil() raises errors if it receives one of the special floats:
-        # -inf (OverflowError), inf (OverflowError), and NaN (ValueError).
-        try:
-            ceiled_actual_error_counter[math.ceil(actual_error)] += 1
-        except (OverflowError, ValueError):
-            ceiled_actual_error_counter["UNDEFINED"] += 1
-            indices_of_values_with_undefined_error.append(index)
-
-        if actual_error > error_bound:
-            indices_of_values_above_error_bound.append(index)
-
-    # Compute and print the final result.
-    print(f"- Total Number of Values: {len(decompressed_field_column)}")
-    print(f"- Without Error: {100 * (equal_values / len(decompressed_field_column))}%")
-    print(
-        (
-            "- Average Relative Error: "
-            f"{100 * (sum_absolute_difference / sum_absolute_test_data_values)}%"
+        length = min(len(test_data_timestamps), len(decompressed_timestamps))
+        unequal_timestamps = numpy.flatnonzero(
+            test_data_timestamps[:length] != decompressed_timestamps[:length]
         )
+        if len(unequal_timestamps) > 0:
+            index = unequal_timestamps[0]
+            merge_pending_chunk_metrics(0)
+            return metrics, (
+                f"ERROR: at index {compared_values + index}, the timestamp in "
+                f"the test data ({test_data_timestamps[index]}) and the decompressed "
+                f"timestamp ({decompressed_timestamps[index]}) are not equal."
+            )
+
+        for field_metrics, test_data_field, decompressed_field in zip(
+            metrics, test_data_values, decompressed_values
+        ):
+            if executor:
+                chunk_metrics = executor.submit(
+                    compute_chunk_metrics,
+                    error_bound,
+                    test_data_timestamps[:length],
+                    test_data_field[:length],
+                    decompressed_field[:length],
+                )
+                pending_chunk_metrics.append((field_metrics, chunk_metrics))
+            else:
+                field_metrics.update(
+                    test_data_timestamps[:length],
+                    test_data_field[:length],
+                    decompressed_field[:length],
+                )
+        compared_values += length
+        merge_pending_chunk_metrics(workers)
+
+        test_data_timestamps = test_data_timestamps[length:]
+        test_data_values = [values[length:] for values in test_data_values]
+        decompressed_timestamps = decompressed_timestamps[length:]
+        decompressed_values = [values[length:] for values in decompressed_values]
+
+    # The length of each pair of timestamp and value columns should always be
+    # equal as this is required by both Apache Parquet files and Apache Arrow
+    # RecordBatches, however, it is checked just to be absolutely sure it is.
+    merge_pending_chunk_metrics(0)
+    test_data_length = compared_values + count_remaining_values(
+        test_data_timestamps, test_data_chunks
     )
-    print(
-        (
-            "- Mean Absolute Percentage Error: "
-            f"{100.0 * (sum_actual_error_ratio_for_mape / len(decompressed_field_column))}%"
-        )
+    decompressed_length = compared_values + count_remaining_values(
+        decompressed_timestamps, decompressed_chunks
     )
-    print(
-        (
-            f"- Maximum Error: {max_actual_error}% due to {max_actual_error_test_data_value} "
-            f"(test data) and {max_actual_error_decompressed_value} (decompressed)"
+    if test_data_length != decompressed_length:
+        return metrics, (
+            "ERROR: the length of the columns in the test data "
+            f"({test_data_length}) and length the decompressed "
+            f"columns ({decompressed_length}) are not equal."
         )
-    )
-    print("- Error Ceil Histogram:", end="")
-    for ceiled_error in range(0, math.ceil(max_actual_error) + 1):
-        print(f" {ceiled_error}% {ceiled_actual_error_counter[ceiled_error]} ", end="")
 
-    if ceiled_actual_error_counter["UNDEFINED"] != 0:
-        print(f" Undefined {ceiled_actual_error_counter['UNDEFINED']}")
-    else:
-        print()
-
-    print_data_points_if_any(
-        "- Exceeded Error Bound (Timestamp, Test Data Value, Decompressed Value):",
-        indices_of_values_above_error_bound,
-        test_data_timestamp_column,
-        test_data_field_column,
-        decompressed_field_column,
-    )
+    return metrics, None
 
-    print_data_points_if_any(
-        "- Undefined Actual Error (Timestamp, Test Data Value, Decompressed Value):",
-        indices_of_values_with_undefined_error,
-        test_data_timestamp_column,
-        test_data_field_column,
-        decompressed_field_column,
-    )
-    print()
 
+def iterate_numpy_chunks(record_batches):
+    # Arrays make computation simpler and float32 matches ModelarDB's precision.
+    for record_batch in record_batches:
+        if record_batch.num_rows > 0:
+            timestamps = record_batch.column(0).to_numpy(zero_copy_only=False)
+            values = [
+                column.to_numpy(zero_copy_only=False).astype(numpy.float32)
+                for column in record_batch.columns[1:]
+            ]
+            yield timestamps, values
 
-def print_data_points_if_any(
-    header,
-    indices,
-    test_data_timestamp_column,
-    test_data_field_column,
-    decompressed_field_column,
-):
-    if indices:
-        print(header)
 
-        for index in indices:
+def count_remaining_values(timestamps, chunks):
+    remaining_values = len(timestamps) if timestamps is not None else 0
+    for timestamps, _values in chunks:
+        remaining_values += len(timestamps)
+    return remaining_values
+
+
+def print_data_points_if_any(header, data_points, file=None):
+    if data_points:
+        print(header, file=file)
+
+        for timestamp, test_data_value, decompressed_value in data_points:
             print(
                 (
-                    f"  {test_data_timestamp_column[index]}, "
-                    f"{test_data_field_column[index]: .10f}, "
-                    f"{decompressed_field_column[index]: .10f}"
-                )
+                    f"  {timestamp}, "
+                    f"{test_data_value: .10f}, "
+                    f"{decompressed_value: .10f}"
+                ),
+                file=file,
             )
 
 
@@ -272,121 +594,233 @@ def measure_data_folder_size_in_kib(data_folder):
     return int(du_output.split(b"\t")[0])
 
 
-def send_sigint_to_process(process):
-    process.send_signal(signal.SIGINT)
-
+def send_sigint_to_process(process, file=None):
     # Ensure process is fully shutdown.
-    while process.poll() is None:
-        time.sleep(1)
-
-    process.wait()
+    process.stop()
 
-    stderr = process.stderr.read()
-    if errors_occurred(stderr):
-        print_stream(stderr)
+    if process.error_occurred.is_set():
+        print_stream(process.stderr(), file)
         return True
 
 
+def validate_error_bound(modelardb_folder, arguments, error_bound_str, port, file=None):
+    error_bound = float(error_bound_str)
+    location = f"grpc://127.0.0.1:{port}"
+
+    delimiter = (13 + len(error_bound_str)) * "="
+    print(delimiter, file=file)
+    print(f"Error Bound: {error_bound_str}", file=file)
+    print(delimiter, file=file)
+
+    # Prepare data folder.
+    temporary_directory = tempfile.TemporaryDirectory()
+    data_folder = temporary_directory.name
+
+    # Ingest the test data.
+    modelardbd = start_modelardbd(modelardb_folder, data_folder, port)
+    try:
+        statistics = ingest_test_data(
+            arguments.parquet_file_or_folder, error_bound_str, port
+        )
+    finally:
+        failed_sigint = send_sigint_to_process(modelardbd, file)  # Flush.
+    if failed_sigint:
+        raise ValueError("Failed to ingest test data.")
+    print(f"Ingested {statistics}", file=file)
+
+    # Only the schema of the test data is read before computing metrics.
+    parquet_files = list_parquet_files(arguments.parquet_file_or_folder)
+    test_data_column_names = parquet.read_schema(parquet_files[0]).names
+
+    # Retrieve each field column, compute metrics for it, and print them.
+    modelardbd = start_modelardbd(modelardb_folder, data_folder, port)
+    try:
+        compute_and_print_metrics_for_table(
+            location,
+            parquet_files,
+            test_data_column_names,
+            arguments,
+            error_bound,
+            file,
+        )
+    except BaseException:
+        modelardbd.kill()
+        raise
+
+    if send_sigint_to_process(modelardbd, file):
+        raise ValueError("Failed to measure the size of the data folder.")
+
+    size_of_data_folder = measure_data_folder_size_in_kib(data_folder)
+    print(
+        "Data Folder Size: {} KiB / {} MiB / {} GiB".format(
+            size_of_data_folder,
+            size_of_data_folder / 1024,
+            size_of_data_folder / 1024 / 1024,
+        ),
+        file=file,
+    )
+
+
+def compute_and_print_metrics_for_table(
+    location, parquet_files, test_data_column_names, arguments, error_bound, file=None
+):
+    flight_client = flight.FlightClient(location)
+    schema = retrieve_schema(flight_client)
+    flight_client.close()
+
+    timestamp_column_name = list(
+        filter(lambda nc: nc[1] == "timestamp[ms]", zip(schema.names, schema.types))
+    )[0][0]
+    column_names = {
+        timestamp_column_name: find_test_data_column_name(
+            test_data_column_names, timestamp_column_name
+        )
+    }
+    for column_name, column_type in zip(schema.names, schema.types):
+        if column_type == "float":
+            column_names[column_name] = find_test_data_column_name(
+                test_data_column_names, column_name
+            )
+
+    for field_column_name, metrics, error in compute_metrics_for_field_columns(
+        location,
+        parquet_files,
+        column_names,
+        error_bound,
+        arguments.single_query,
+        arguments.workers,
+    ):
+        print(field_column_name, file=file)
+        print_metrics_or_error(metrics, error, file)
+
+
+def compute_max_parallel_servers(memory_per_server_in_gib):
+    # Each server uses multiple threads and a share of the memory, so the
+    # number of servers is limited by both the cores and the available memory.
+    available_memory_in_bytes = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf(
+        "SC_PAGE_SIZE"
+    )
+    servers_for_memory = int(
+        available_memory_in_bytes / (memory_per_server_in_gib * 1024**3)
+    )
+    return max(1, min(os.cpu_count(), servers_for_memory))
+
+
+def validate_error_bounds_in_parallel(
+    modelardb_folder, arguments, max_parallel_servers
+):
+    # Each error bound is validated by its own server with its own port and
+    # data folder. The output for each error bound is buffered and printed in
+    # the order the error bounds are given as soon as all before it are done.
+    error_bound_strs = arguments.relative_error_bound
+    outputs = [io.StringIO() for _ in error_bound_strs]
+
+    with ThreadPoolExecutor(max_parallel_servers) as executor:
+        futures = [
+            executor.submit(
+                validate_error_bound,
+                modelardb_folder,
+                arguments,
+                error_bound_str,
+                FLIGHT_PORT + index,
+                output,
+            )
+            for index, (error_bound_str, output) in enumerate(
+                zip(error_bound_strs, outputs)
+            )
+        ]
+
+        for future, output in zip(futures, outputs):
+            try:
+                future.result()
+            finally:
+                print(output.getvalue(), end="")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Validate ModelarDB's compression for a set of error bounds."
+    )
+    parser.add_argument("parquet_file_or_folder")
+    parser.add_argument("relative_error_bound", nargs="*")
+
+    # A single query avoids sorting and scanning the table once per field
+    # column while workers compute the metrics for field columns in parallel.
+    parser.add_argument(
+        "--single-query",
+        action="store_true",
+        help="retrieve all field columns with one query instead of one per column",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes that validate field columns in parallel, with "
+        "--single-query they compute the metrics for the retrieved field columns",
+    )
+
+    # Each error bound can be validated by its own server in parallel.
+    parser.add_argument(
+        "--parallel-servers",
+        type=int,
+        default=1,
+        help="number of servers that validate error bounds in parallel, "
+        "0 derives it from the number of cores and the available memory",
+    )
+    parser.add_argument(
+        "--memory-per-server",
+        type=float,
+        default=MEMORY_PER_SERVER_IN_GIB,
+        help="GiB of memory needed by each server when --parallel-servers is 0",
+    )
+
+    return parser.parse_args()
+
+
 # Main Function.
 if __name__ == "__main__":
-    # Ensure the necessary arguments are provided.
-    if len(sys.argv) < 2:
-        print(f"usage: {sys.argv[0]} parquet_file_or_folder relative_error_bound*")
+    arguments = parse_arguments()
+    if arguments.workers < 1:
+        print("ERROR: the number of workers must be at least one")
         sys.exit(1)
 
+    if arguments.parallel_servers < 0:
+        print("ERROR: the number of parallel servers cannot be negative")
+        sys.exit(1)
+
+    # All error bounds are checked before any of them are validated.
+    for maybe_error_bound in arguments.relative_error_bound:
+        if float(maybe_error_bound) < 0.0:
+            raise ValueError("Error bound must be a positive normal float.")
+
     # The script assumes it runs on Linux.
     if sys.platform != "linux":
         print(f"ERROR: {sys.argv[0]} only supports Linux")
         sys.exit(1)
 
-    # Clone repositories.
+    # Clone repository.
     modelardb_folder = extract_repository_name(MODELARDB_REPOSITORY)
     git_clone(MODELARDB_REPOSITORY)
 
-    utilities_folder = extract_repository_name(UTILITIES_REPOSITORY)
-    utilities_loader = f"{utilities_folder}Apache-Parquet-Loader/main.py"
-    git_clone(UTILITIES_REPOSITORY)
-
     # Prepare new executable.
     if not cargo_build_release(modelardb_folder):
         raise ValueError("Failed to build ModelarDB in release mode.")
 
     # Evaluate error bounds.
-    flight_client = flight.FlightClient("grpc://127.0.0.1:9999")
-    for maybe_error_bound in sys.argv[2:]:
-        # Prepare error bound.
-        error_bound = float(maybe_error_bound)
-        if error_bound < 0.0:
-            raise ValueError("Error bound must be a positive normal float.")
-        error_bound_str = maybe_error_bound
-
-        delimiter = (13 + len(error_bound_str)) * "="
-        print(delimiter)
-        print(f"Error Bound: {error_bound_str}")
-        print(delimiter)
-
-        # Prepare data folder.
-        temporary_directory = tempfile.TemporaryDirectory()
-        data_folder = temporary_directory.name
-
-        # Ingest the test data.
-        modelardbd = start_modelardbd(modelardb_folder, data_folder)
-        failed_ingest = ingest_test_data(utilities_loader, sys.argv[1], error_bound_str)
-        failed_sigint = send_sigint_to_process(modelardbd)  # Flush.
-        if failed_ingest or failed_sigint:
-            raise ValueError("Failed to ingest test data.")
-
-        # Read the test data so metrics can be computed.
-        test_data = parquet.read_table(sys.argv[1])
-
-        # Retrieve each field column, compute metrics for it, and print them.
-        modelardbd = start_modelardbd(modelardb_folder, data_folder)
-        schema = retrieve_schema(flight_client)
-        timestamp_column_name = list(
-            filter(lambda nc: nc[1] == "timestamp[ms]", zip(schema.names, schema.types))
-        )[0][0]
-        test_data_timestamp_column = test_data.column(timestamp_column_name)
-
-        for column_name, column_type in zip(schema.names, schema.types):
-            if column_type == "float":
-                print(column_name)
-                field_column_name = column_name
-
-                try:
-                    test_data_field_column = test_data.column(field_column_name)
-                except:
-                    # Spaces in the name may have been replaced by underscores
-                    # and upper case columns may have been converted to lower case.
-                    field_column_name_lowercase_with_space = field_column_name.replace(
-                        "_", " "
-                    ).lower()
-                    test_data_field_column = test_data.column(
-                        test_data.column_names.lower().index(
-                            field_column_name_lowercase_with_space
-                        )
-                    )
-
-                decompressed_columns = retrieve_ingested_columns(
-                    flight_client, timestamp_column_name, field_column_name
-                )
-
-                compute_and_print_metrics(
-                    test_data_timestamp_column,
-                    test_data_field_column,
-                    decompressed_columns,
-                    error_bound,
-                )
-
-        if send_sigint_to_process(modelardbd):
-            raise ValueError("Failed to measure the size of the data folder.")
+    if arguments.parallel_servers == 0:
+        max_parallel_servers = compute_max_parallel_servers(arguments.memory_per_server)
+    else:
+        max_parallel_servers = arguments.parallel_servers
 
-        size_of_data_folder = measure_data_folder_size_in_kib(data_folder)
-        print(
-            "Data Folder Size: {} KiB / {} MiB / {} GiB".format(
-                size_of_data_folder,
-                size_of_data_folder / 1024,
-                size_of_data_folder / 1024 / 1024,
-            )
+    if max_parallel_servers > 1:
+        validate_error_bounds_in_parallel(
+            modelardb_folder, arguments, max_parallel_servers
         )
-
-    flight_client.close()
+    else:
+        for error_bound_str in arguments.relative_error_bound:
+            validate_error_bound(
+                modelardb_folder,
+                arguments,
+                error_bound_str,
+                FLIGHT_PORT,
+            )